@@ -1,6 +1,7 @@
 """列出你 Telegram 里所有的群组/频道，方便选择要监控哪些"""
 from __future__ import annotations
 import asyncio
+import sys
 from telethon import TelegramClient
 from telethon.tl.types import Channel, Chat
 
@@ -19,6 +20,7 @@ async def main():
     print("=" * 70)
     
     idx = 1
+    rows: list[str] = []
     async for dialog in client.iter_dialogs():
         entity = dialog.entity
         if isinstance(entity, (Channel, Chat)):
@@ -26,8 +28,11 @@ async def main():
             title = getattr(entity, "title", "?")[:28]
             eid = entity.id
             uname = getattr(entity, "username", "") or ""
-            print(f"{idx:<5} {dtype:<8} {title:<30} {eid:<18} {uname}")
+            rows.append(
+                f"{str(idx).ljust(5)} {dtype.ljust(8)} {title.ljust(30)} {str(eid).ljust(18)} {uname}\n"
+            )
             idx += 1
+    sys.stdout.write("".join(rows))
     
     print("=" * 70)
     print(f"\n共 {idx - 1} 个群组/频道")
@@ -36,5 +41,4 @@ async def main():
     await client.disconnect()
 
 if __name__ == "__main__":
-    loop = asyncio.new_event_loop()
-    loop.run_until_complete(main())
+    asyncio.run(main())
@@ -7,9 +7,9 @@ from __future__ import annotations
 import asyncio
 import collections
 import logging
-import re
 from datetime import datetime, timezone, timedelta
-from typing import TYPE_CHECKING, List, Optional, Set
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Set, Tuple
 
 import httpx
 
@@ -20,20 +20,70 @@ logger = logging.getLogger("tg-monitor.alerts")
 
 BJT = timezone(timedelta(hours=8))
 
+# 单条告警最多展示的命中关键词数；达到上限即停止扫描剩余关键词
+MAX_MATCHED_KEYWORDS = 3
 
+# 内存去重缓存容量（条）
+ALERTED_CACHE_SIZE = 2000
+
+# 去重记录批量持久化：攒够条数或到达间隔即写入一次（单事务）
+PERSIST_BATCH_SIZE = 200
+PERSIST_FLUSH_INTERVAL = 2.0
+
+# 告警合并窗口（秒）：窗口内到达的告警合并为一条 Bot 消息，避免突发时触发 429 限流
+ALERT_COALESCE_WINDOW = 0.5
+# 合并后单条消息的最大长度（Telegram 上限 4096，留出余量）
+ALERT_MAX_LEN = 4000
+# 推送遇到 429 时按 retry_after 等待后的最大重试次数
+ALERT_MAX_RETRIES = 3
+# alerts_enabled 设置的缓存有效期（秒），避免每条消息都查询一次 SQLite
+ENABLED_CACHE_TTL = 5.0
+ALERT_SEPARATOR = "\n\n━━━━━━━━━━━━━━━━━━━━\n\n"
+
+
+@lru_cache(maxsize=1024)
 def _to_bjt(iso_str: str) -> str:
     """将 ISO 时间字符串转为北京时间 (UTC+8) 可读格式"""
     if not iso_str:
         return "?"
     try:
-        dt = datetime.fromisoformat(iso_str.replace("Z", "+00:00"))
+        dt = _parse_iso_fast(iso_str)
+        if dt is None:
+            if iso_str.endswith("Z"):
+                iso_str = iso_str[:-1] + "+00:00"
+            dt = datetime.fromisoformat(iso_str)
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(BJT).strftime("%m-%d %H:%M")
+        dt = dt.astimezone(BJT)
+        return f"{dt.month:02d}-{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}"
     except Exception:
         return iso_str[:16].replace("T", " ")
 
 
+def _parse_iso_fast(s: str) -> Optional[datetime]:
+    """
+    按固定位置切片解析 `YYYY-MM-DDTHH:MM:SS[Z|±HH:MM]`（采集器写入的格式）。
+    其它格式返回 None，由调用方回退到 fromisoformat。
+    """
+    n = len(s)
+    if n < 19 or s[10] != "T":
+        return None
+    if n == 19:
+        tz = None
+    elif n == 20 and s[19] == "Z":
+        tz = timezone.utc
+    elif n == 25 and s[19] in "+-" and s[22] == ":":
+        offset = timedelta(hours=int(s[20:22]), minutes=int(s[23:25]))
+        tz = timezone(-offset if s[19] == "-" else offset)
+    else:
+        return None
+    return datetime(
+        int(s[0:4]), int(s[5:7]), int(s[8:10]),
+        int(s[11:13]), int(s[14:16]), int(s[17:19]),
+        tzinfo=tz,
+    )
+
+
 class AlertManager:
     """关键词告警管理器（告警去重状态持久化到 SQLite，重启不丢失）"""
 
@@ -42,16 +92,30 @@ class AlertManager:
         self.db = db  # 可选数据库引用，用于持久化去重
         self.bot_token = config.get("bot", {}).get("token", "")
         self.owner_id = config.get("bot", {}).get("owner_id")
+        # Bot 推送凭据是否齐全；不齐全时无需拼装告警正文
+        self._can_send = bool(self.bot_token and self.owner_id)
         self.alert_cfg = config.get("alerts", {})
         self.enabled = self.alert_cfg.get("enabled", False)
         self.keywords: List[str] = self.alert_cfg.get("keywords", [])
-        # 编译正则模式，忽略大小写
-        self._patterns = [
-            re.compile(re.escape(kw), re.IGNORECASE) for kw in self.keywords
-        ]
-        # 内存去重缓存：使用 deque 实现 FIFO 淘汰，防止随机淘汰最近 ID 导致重复告警
-        self._alerted_deque: collections.deque = collections.deque(maxlen=2000)
-        self._alerted_ids: Set[str] = set()  # deque 的镜像 set，保持 O(1) 查找
+        # 关键词均为字面量，预先 casefold，匹配时走 str 的 `in` 子串查找，不经过正则引擎
+        # (casefold 后的关键词, 原关键词) 预先配对，热循环中无需再按下标取原词
+        self._kw_pairs: List[Tuple[str, str]] = [(kw.casefold(), kw) for kw in self.keywords]
+        # 最短关键词长度：比它还短的消息不可能命中，直接跳过扫描
+        self._min_kw_len: int = min((len(cf) for cf, _ in self._kw_pairs), default=0)
+        # 内存去重缓存：OrderedDict 按插入顺序 FIFO 淘汰，同时提供 O(1) 查找
+        self._alerted: "collections.OrderedDict[str, None]" = collections.OrderedDict()
+        # 复用的 HTTP 客户端（懒加载），避免每条告警都重新建立 TCP/TLS 连接
+        self._http: Optional[httpx.AsyncClient] = None
+        # 待推送告警队列 + 后台合并发送任务（首次告警时懒启动）
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._drain_task: Optional[asyncio.Task] = None
+        # alerts_enabled 开关缓存: (读取时刻 loop.time(), 值)
+        self._enabled_cache: Optional[Tuple[float, bool]] = None
+        # 待持久化的去重 ID 缓冲 + 定时刷写任务（首次告警时懒启动）
+        self._pending_ids: List[str] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # 后台持久化任务的强引用，防止任务在完成前被 GC 回收
+        self._bg: Set[asyncio.Task] = set()
 
     async def load_from_db(self):
         """启动时从数据库加载最近 24h 的已告警 ID，防止重启后重复推送历史消息。"""
@@ -59,8 +123,9 @@ class AlertManager:
             return
         try:
             ids = await self.db.get_recent_alerted_ids(hours=24)
-            self._alerted_ids = set(ids)
-            self._alerted_deque = collections.deque(ids, maxlen=2000)
+            self._alerted = collections.OrderedDict.fromkeys(ids)
+            while len(self._alerted) > ALERTED_CACHE_SIZE:
+                self._alerted.popitem(last=False)
             logger.info(f"✅ 加载 {len(ids)} 条历史告警去重记录")
         except Exception as e:
             logger.warning(f"⚠️ 加载告警去重记录失败，将使用空缓存: {e}")
@@ -75,17 +140,9 @@ class AlertManager:
         如果命中，发送告警并返回匹配的关键词；否则返回 None。
         优先读数据库中的 alerts_enabled 设置（运行时可动态切换）。
         """
-        # 动态读取数据库开关（如果有 db 引用）
-        enabled = self.enabled
-        if self.db is not None:
-            try:
-                db_val = await self.db.get_setting("alerts_enabled")
-                if db_val is not None:
-                    enabled = db_val.lower() == "true"
-            except Exception:
-                pass  # 读取失败时回落到 config.yaml 的值
+        enabled = await self._is_enabled()
 
-        if not enabled or not self._patterns:
+        if not enabled or not self._kw_pairs:
             return None
 
         text = msg.get("text") or ""
@@ -93,75 +150,250 @@ class AlertManager:
             return None
 
         # 去重检查（内存 + 持久化双保险）
+        # 注意：从这里的检查到下方写入 self._alerted 之间不能出现 await，
+        # 否则并发的 check_message 可能同时通过检查而重复告警
         msg_key = f"{msg.get('group_id')}_{msg.get('id')}"
-        if msg_key in self._alerted_ids:
+        if msg_key in self._alerted:
             return None
 
-        # 检查关键词
-        matched = []
-        for i, pattern in enumerate(self._patterns):
-            if pattern.search(text):
-                matched.append(self.keywords[i])
+        # 检查关键词（忽略大小写的子串匹配，命中数达到上限即提前结束）
+        text_cf = text.casefold()
+        if len(text_cf) < self._min_kw_len:
+            return None
+        matched: List[str] = []
+        for kw_cf, kw in self._kw_pairs:
+            if kw_cf in text_cf:
+                matched.append(kw)
+                if len(matched) >= MAX_MATCHED_KEYWORDS:
+                    break
 
         if not matched:
             return None
 
-        # 记录去重：写入 deque（自动 FIFO 淘汰旧 ID）+ 同步 set
-        if len(self._alerted_deque) == self._alerted_deque.maxlen:
-            # deque 满了，最早的 ID 会被自动弹出，同步从 set 中删除
-            oldest = self._alerted_deque[0]
-            self._alerted_ids.discard(oldest)
-        self._alerted_deque.append(msg_key)
-        self._alerted_ids.add(msg_key)
+        # 记录去重（在任何 await 之前占位）：超出容量时淘汰最早写入的 ID
+        self._alerted[msg_key] = None
+        if len(self._alerted) > ALERTED_CACHE_SIZE:
+            self._alerted.popitem(last=False)
 
-        # 持久化到数据库（后台执行，不阻塞主流程）
+        # 持久化到数据库（缓冲后批量写入，不阻塞主流程）
         if self.db is not None:
-            try:
-                await self.db.add_alerted_message(msg_key)
-            except Exception as e:
-                logger.warning(f"⚠️ 持久化告警去重失败: {e}")
+            self._pending_ids.append(msg_key)
+            if len(self._pending_ids) >= PERSIST_BATCH_SIZE:
+                self._spawn_flush()
+            elif self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_ids_loop())
 
         # 发送告警
         keywords_str = ", ".join(f"「{k}」" for k in matched)
         sender = msg.get("sender_name", "?")
-        date_str = _to_bjt(msg.get("date", ""))  # 展示北京时间
-
-        # 截断消息文本
-        display_text = text[:300]
-        if len(text) > 300:
-            display_text += "..."
-
-        alert_text = (
-            f"🚨 *关键词告警*\n\n"
-            f"🔑 命中: {keywords_str}\n"
-            f"📌 群组: {group_name}\n"
-            f"👤 发送者: {sender}\n"
-            f"⏰ 时间: {date_str}\n\n"
-            f"💬 内容:\n{display_text}"
-        )
-
-        await self._send_alert(alert_text)
+
+        if self._can_send:
+            date_str = _to_bjt(msg.get("date", ""))  # 展示北京时间
+
+            # 截断消息文本
+            display_text = text if len(text) <= 300 else f"{text[:300]}…"
+
+            alert_text = (
+                f"🚨 *关键词告警*\n\n"
+                f"🔑 命中: {keywords_str}\n"
+                f"📌 群组: {group_name}\n"
+                f"👤 发送者: {sender}\n"
+                f"⏰ 时间: {date_str}\n\n"
+                f"💬 内容:\n{display_text}"
+            )
+            await self._send_alert(alert_text)
+        else:
+            logger.warning("⚠️ 告警未配置 bot_token 或 owner_id，跳过推送")
+
         logger.info(f"🚨 告警: {keywords_str} in [{group_name}] by {sender}")
 
         return keywords_str
 
+    async def _is_enabled(self) -> bool:
+        """
+        告警开关：优先读数据库中的 alerts_enabled（运行时可动态切换），
+        结果缓存 ENABLED_CACHE_TTL 秒；读取失败时回落到 config.yaml 的值。
+        """
+        if self.db is None:
+            return self.enabled
+
+        now = asyncio.get_running_loop().time()
+        if self._enabled_cache is not None and now - self._enabled_cache[0] < ENABLED_CACHE_TTL:
+            return self._enabled_cache[1]
+
+        enabled = self.enabled
+        try:
+            db_val = await self.db.get_setting("alerts_enabled")
+            if db_val is not None:
+                enabled = db_val.lower() == "true"
+        except Exception:
+            pass  # 读取失败时回落到 config.yaml 的值
+        self._enabled_cache = (now, enabled)
+        return enabled
+
+    async def _flush_pending_ids(self):
+        """将缓冲中的去重 ID 一次性写入数据库，失败只记日志"""
+        if not self._pending_ids:
+            return
+        ids, self._pending_ids = self._pending_ids, []
+        try:
+            await self.db.add_alerted_messages_batch(ids)
+        except Exception as e:
+            logger.warning(f"⚠️ 持久化告警去重失败: {e}")
+
+    def _spawn_flush(self) -> asyncio.Task:
+        """在独立任务中刷写缓冲（登记到 _bg，close() 会等待它完成）"""
+        task = asyncio.create_task(self._flush_pending_ids())
+        self._bg.add(task)
+        task.add_done_callback(self._bg.discard)
+        return task
+
+    async def _flush_ids_loop(self):
+        """
+        定时刷写去重 ID 缓冲；缓冲为空即退出，下次有新 ID 时由 check_message 重新拉起。
+        写入经 shield 保护：close() 取消本循环时，已取出的一批仍会写完。
+        """
+        while self._pending_ids:
+            await asyncio.sleep(PERSIST_FLUSH_INTERVAL)
+            await asyncio.shield(self._spawn_flush())
+
     async def _send_alert(self, text: str):
-        """通过 Bot API 发送告警消息"""
-        if not self.bot_token or not self.owner_id:
+        """将告警放入推送队列，由后台任务合并后发送"""
+        if not self._can_send:
             logger.warning("⚠️ 告警未配置 bot_token 或 owner_id，跳过推送")
             return
 
+        self._queue.put_nowait(text)
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self._drain_loop())
+
+    async def _drain_loop(self):
+        """
+        后台消费告警队列：合并窗口内的告警后一次性推送。
+        收到 None 哨兵（close() 放入）时先发完手上已取出的告警再退出。
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            items = [first]
+            stopping = False
+            deadline = loop.time() + ALERT_COALESCE_WINDOW
+            while True:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                items.append(item)
+
+            await self._deliver(items)
+            if stopping:
+                return
+
+    async def _deliver(self, items: List[str]):
+        """
+        合并推送一批告警。合并消息被拒（400，通常是某条用户文本的 Markdown 不配对）时
+        逐条重发，单条仍被拒则去掉 parse_mode 以纯文本发送，坏消息只影响它自己。
+        """
+        for group in self._pack_alerts(items):
+            if await self._post_message(ALERT_SEPARATOR.join(group)) != 400:
+                continue
+            for item in group:
+                if len(group) == 1 or await self._post_message(item) == 400:
+                    await self._post_message(item, parse_mode=None)
+
+    @staticmethod
+    def _pack_alerts(items: List[str]) -> List[List[str]]:
+        """将多条告警分组，每组用 ALERT_SEPARATOR 拼接后不超过 ALERT_MAX_LEN"""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        size = 0
+        for item in items:
+            if current and size + len(ALERT_SEPARATOR) + len(item) > ALERT_MAX_LEN:
+                groups.append(current)
+                current, size = [], 0
+            size += len(item) + (len(ALERT_SEPARATOR) if current else 0)
+            current.append(item)
+        if current:
+            groups.append(current)
+        return groups
+
+    async def _post_message(self, text: str, parse_mode: Optional[str] = "Markdown") -> int:
+        """
+        通过 Bot API 发送一条消息，返回 HTTP 状态码（网络异常返回 0）。
+        429 时按服务端给出的 retry_after 等待后重试。
+        """
         url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-        payload = {
-            "chat_id": self.owner_id,
-            "text": text,
-            "parse_mode": "Markdown",
-        }
+        payload = {"chat_id": self.owner_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
 
-        try:
-            async with httpx.AsyncClient(timeout=10) as client:
+        for attempt in range(ALERT_MAX_RETRIES + 1):
+            try:
+                client = await self._ensure_http()
                 resp = await client.post(url, json=payload)
-                if resp.status_code != 200:
-                    logger.error(f"❌ 告警推送失败: {resp.text[:200]}")
-        except Exception as e:
-            logger.error(f"❌ 告警推送异常: {e}")
+            except Exception as e:
+                logger.error(f"❌ 告警推送异常: {e}")
+                return 0
+            if resp.status_code == 429 and attempt < ALERT_MAX_RETRIES:
+                try:
+                    delay = resp.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    delay = 1
+                logger.warning(f"⚠️ 告警推送触发限流，{delay}s 后重试")
+                await asyncio.sleep(delay)
+                continue
+            if resp.status_code != 200:
+                logger.error(f"❌ 告警推送失败: {resp.text[:200]}")
+            return resp.status_code
+        return 429
+
+    async def _ensure_http(self) -> httpx.AsyncClient:
+        """获取（必要时创建）长连接 HTTP 客户端"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=10,
+                limits=httpx.Limits(max_keepalive_connections=4),
+            )
+        return self._http
+
+    async def close(self):
+        """刷写剩余去重记录，停止后台推送任务（尽量发出队列中剩余的告警），并关闭 HTTP 客户端"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        # 循环被取消时正在进行的写入在 _bg 中继续，这里等它完成，再刷写剩余缓冲
+        if self._bg:
+            await asyncio.gather(*self._bg, return_exceptions=True)
+        if self.db is not None:
+            await self._flush_pending_ids()
+
+        # 不取消推送任务：放入哨兵让它把已取出/排队中的告警发完后自行退出
+        if self._drain_task is not None and not self._drain_task.done():
+            self._queue.put_nowait(None)
+            await self._drain_task
+        self._drain_task = None
+
+        # 推送任务已退出（或从未启动）时，队列中可能仍有残留
+        pending: List[str] = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                pending.append(item)
+        if pending:
+            await self._deliver(pending)
+
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
@@ -6,38 +6,70 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 from telegram import BotCommand
 from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler,
+    AIORateLimiter, Application, CommandHandler,
     MessageHandler, filters, ContextTypes,
 )
 from telegram.constants import ParseMode
 
-from .config import load_config
+from .config import DEFAULT_BLOCK_DOMAINS, load_config
 from .database import Database
 from .summarizer import Summarizer
 from .bot_handlers import BotUtilsMixin, BotActionsMixin, BotCommandsMixin, BotCallbacksMixin
+from .bot_handlers.utils import TokenBucket
 
 logger = logging.getLogger("tg-monitor.bot")
 
+# 定时推送最近一次成功时间（存入 settings 表，用于重启后补发错过的推送）
+PUSH_LAST_RUN_KEY = "scheduled_push_last_run"
+# 错过的推送在多长时间内仍允许补发（秒）
+PUSH_MISFIRE_GRACE = 3600
+
+# 北京时间无夏令时，用固定偏移即可精确表示 Asia/Shanghai，且不依赖系统 tzdata
+# （python:slim 镜像默认不含 tzdata，ZoneInfo 会直接找不到时区）
+_SHANGHAI_TZ = timezone(timedelta(hours=8), "Asia/Shanghai")
+
 
 class MonitorBot(BotUtilsMixin, BotActionsMixin, BotCommandsMixin, BotCallbacksMixin):
     """TG 监控机器人 (核心逻辑整合版)"""
 
+    # 每个更新都会访问这些属性，固定槽位比实例 __dict__ 查找更快、更省内存
+    __slots__ = (
+        "config", "bot_token", "owner_id", "_ai_model", "_block_domains",
+        "db", "summarizer", "_chat_buckets", "_global_bucket",
+    )
+
     def __init__(self, config: dict, owner_id: Optional[int] = None):
         self.config = config
         self.bot_token = config.get("bot", {}).get("token", "")
         self.owner_id = owner_id or config.get("bot", {}).get("owner_id")
+        # 高频读取的配置项预先取出，避免每次处理都走 dict.get 链
+        self._ai_model: str = config.get("ai", {}).get("model", "?")
+        self._block_domains: Tuple[str, ...] = tuple(
+            config.get("filtering", {}).get("block_domains", DEFAULT_BLOCK_DOMAINS)
+        )
         self.db: Optional[Database] = None
         self.summarizer: Optional[Summarizer] = None
+        # 每个聊天一个发送令牌桶（在事件循环内按需创建）
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        # 未启用 AIORateLimiter 时的全局发送令牌桶
+        self._global_bucket: Optional[TokenBucket] = None
 
     async def _ensure_db(self):
         """确保数据库连接"""
         if self.db is None:
             self.db = Database(self.config["database"]["path"])
             await self.db.connect()
+            await self.db.init_pool()
             self.summarizer = Summarizer(self.config, self.db)
 
     def _is_owner(self, user_id: int) -> bool:
@@ -57,21 +89,46 @@ class MonitorBot(BotUtilsMixin, BotActionsMixin, BotCommandsMixin, BotCallbacksM
             logger.error("❌ 未配置 bot.token，请在 config.yaml 中设置")
             return
 
-        app = Application.builder().token(self.bot_token).build()
+        # 可选：安装了 uvloop 时用它作为事件循环（PTB 通过事件循环策略创建循环）
+        # uvloop.install() 在 Python 3.12+ 已弃用，直接设置事件循环策略
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            logger.info("⚡ 已启用 uvloop 事件循环")
+
+        builder = Application.builder().token(self.bot_token)
+        # 全局出站限流交给 PTB 的 AIORateLimiter（需 python-telegram-bot[rate-limiter]），
+        # 覆盖所有 Bot API 调用，并自动处理 429 重试；未安装时跳过
+        try:
+            builder = builder.rate_limiter(AIORateLimiter(
+                overall_max_rate=28, overall_time_period=1,
+                group_max_rate=20, group_time_period=60,
+                max_retries=2,
+            ))
+        except RuntimeError:
+            logger.info("ℹ️ 未安装 aiolimiter，跳过全局限流器（仍按聊天限速发送）")
+        app = builder.build()
+
+        # 所有者过滤器在分发阶段就丢弃陌生人的更新（未配置 owner_id 时不匹配任何人）
+        if self.owner_id is None:
+            logger.warning("⚠️ 未配置 owner_id，拒绝所有访问请求")
+        owner_filter = filters.User(user_id=self.owner_id)
 
         # 注册命令
-        app.add_handler(CommandHandler("start", self.cmd_start))
-        app.add_handler(CommandHandler("summary", self.cmd_summary))
-        app.add_handler(CommandHandler("stats", self.cmd_stats))
-        app.add_handler(CommandHandler("links", self.cmd_links))
-        app.add_handler(CommandHandler("search", self.cmd_search))
+        app.add_handler(CommandHandler("start", self.cmd_start, filters=owner_filter))
+        app.add_handler(CommandHandler("summary", self.cmd_summary, filters=owner_filter))
+        app.add_handler(CommandHandler("stats", self.cmd_stats, filters=owner_filter))
+        app.add_handler(CommandHandler("links", self.cmd_links, filters=owner_filter))
+        app.add_handler(CommandHandler("search", self.cmd_search, filters=owner_filter))
+        # 非所有者的 /start 仍给出无权限提示
+        app.add_handler(CommandHandler("start", self.cmd_denied))
 
         # 注册回调
-        app.add_handler(CallbackQueryHandler(self.handle_callback))
+        for handler in self.build_callback_handlers():
+            app.add_handler(handler)
 
         # 注册文本处理（搜索）
         app.add_handler(MessageHandler(
-            filters.TEXT & ~filters.COMMAND, self.handle_text
+            filters.TEXT & ~filters.COMMAND & owner_filter, self.handle_text
         ))
 
         # 设置菜单命令
@@ -115,6 +172,10 @@ class MonitorBot(BotUtilsMixin, BotActionsMixin, BotCommandsMixin, BotCallbacksM
                     await self._send_long_message(
                         context.bot, self.owner_id, full_text, ParseMode.MARKDOWN
                     )
+                    await self.db.set_setting(
+                        PUSH_LAST_RUN_KEY,
+                        datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    )
                     logger.info("✅ 定时推送完成")
                 except Exception as e:
                     logger.error(f"❌ 定时推送失败: {e}", exc_info=True)
@@ -128,23 +189,57 @@ class MonitorBot(BotUtilsMixin, BotActionsMixin, BotCommandsMixin, BotCallbacksM
                     except Exception:
                         pass  # 发送失败就放弃，不归递
 
-            # 解析 cron 表达式，显式指定 Asia/Shanghai 时区确保 9:00/21:00 是北京时间
-            parts = cron_str.split()
-            trigger = CronTrigger(
-                minute=parts[0], hour=parts[1],
-                day=parts[2], month=parts[3], day_of_week=parts[4],
-                timezone="Asia/Shanghai",
-            )
-            app.job_queue.run_custom(scheduled_push, job_kwargs={"trigger": trigger})
+            # 解析 cron 表达式，显式指定北京时间确保 9:00/21:00 是北京时间
+            trigger = CronTrigger.from_crontab(cron_str, timezone=_SHANGHAI_TZ)
+            # 调度器短暂阻塞导致的延迟仍在宽限期内执行，积压的多次触发合并为一次
+            app.job_queue.run_custom(scheduled_push, job_kwargs={
+                "trigger": trigger,
+                "misfire_grace_time": PUSH_MISFIRE_GRACE,
+                "coalesce": True,
+            })
+
+            # 内存 job store 不跨进程保留状态：启动时对照上次成功推送时间，
+            # 若恰好在重启期间错过一次触发（且仍在宽限期内）则立即补发
+            async def catch_up_push(context: ContextTypes.DEFAULT_TYPE):
+                try:
+                    await self._ensure_db()
+                    last_run = await self.db.get_setting(PUSH_LAST_RUN_KEY)
+                    if not last_run:
+                        return  # 首次启用不补发
+                    missed = trigger.get_next_fire_time(None, datetime.fromisoformat(last_run))
+                    now = datetime.now(timezone.utc)
+                    if missed and missed <= now and (now - missed).total_seconds() <= PUSH_MISFIRE_GRACE:
+                        logger.info(f"⏰ 检测到重启期间错过的定时推送 ({missed:%H:%M})，立即补发")
+                        await scheduled_push(context)
+                except Exception as e:
+                    logger.warning(f"⚠️ 定时推送补发检查失败: {e}")
+
+            app.job_queue.run_once(catch_up_push, when=0)
             logger.info(f"⏰ 定时推送已注册: {cron_str} (Asia/Shanghai)")
 
-        logger.info("🚀 启动 TG 机器人...")
-        app.run_polling(drop_pending_updates=True)
+        # ─── 更新接收方式：配置了 webhook.url 时由 Telegram 推送，否则长轮询 ───
+        webhook_cfg = self.config.get("bot", {}).get("webhook") or {}
+        webhook_url = (webhook_cfg.get("url") or "").rstrip("/")
+        if webhook_url and webhook_cfg.get("mode", "webhook") != "polling":
+            port = int(webhook_cfg.get("port", 8443))
+            logger.info(f"🚀 启动 TG 机器人 (webhook, 监听端口 {port})...")
+            app.run_webhook(
+                listen=webhook_cfg.get("listen", "0.0.0.0"),
+                port=port,
+                url_path=self.bot_token,
+                webhook_url=f"{webhook_url}/{self.bot_token}",
+                secret_token=webhook_cfg.get("secret") or None,
+                drop_pending_updates=True,
+            )
+        else:
+            logger.info("🚀 启动 TG 机器人 (长轮询)...")
+            # PTB 启动轮询时本就通过 deleteWebhook(drop_pending_updates) 丢弃积压，无额外往返；
+            # 长轮询超时拉到 30s，空闲时 getUpdates 请求数约为默认 10s 的三分之一
+            app.run_polling(drop_pending_updates=True, timeout=30)
 
 
 def run_bot(config_path=None):
     """启动机器人入口"""
-    import logging
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
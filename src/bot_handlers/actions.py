@@ -1,13 +1,26 @@
 import logging
 import asyncio
+import time
 from datetime import datetime, timezone, timedelta
+from typing import Optional
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.constants import ChatAction, ParseMode
+from .utils import _BACK_MARKUP, _BACK_ROW, _parse_iso
 
 logger = logging.getLogger("tg-monitor.bot.actions")
 
+_MEDALS = ("🥇", "🥈", "🥉", "4️⃣", "5️⃣")
+_SEP = "━" * 20
+_THIN_SEP = "─" * 20
+
+# 搜索结果缓存有效期（秒）
+SEARCH_CACHE_TTL = 600
+
 class BotActionsMixin:
     """提供各种具体汇报和服务功能（依赖 BotUtilsMixin 部分辅助方法）"""
 
+    __slots__ = ()
+
     async def _do_summary(self, message, hours: int):
         await self._ensure_db()
         chat_id = message.chat_id
@@ -17,9 +30,10 @@ class BotActionsMixin:
 
         now = datetime.now(timezone.utc)
         since = (now - timedelta(hours=hours)).isoformat(timespec='seconds')
-        until = now.isoformat(timespec='seconds')
-        msg_count = await self.db.get_message_count(since=since)
-        date_range = await self.db.get_date_range(since=since)
+        msg_count, date_range = await asyncio.gather(
+            self.db.get_message_count(since=since),
+            self.db.get_date_range(since=since),
+        )
 
         if msg_count == 0:
             await bot.send_message(
@@ -37,43 +51,42 @@ class BotActionsMixin:
                 f"🧠 *AI 摘要任务已启动*\n\n"
                 f"📊 消息数量: {msg_count} 条\n"
                 f"⏰ 时间范围: {actual_first} → {actual_last}\n"
-                f"🤖 模型: `{self.config.get('ai', {}).get('model', '?')}`\n\n"
+                f"🤖 模型: `{self._ai_model}`\n\n"
                 f"进度: |□□□□□□□□□□| 0%\n"
                 f"状态: 正在初始化..."
             ),
             parse_mode=ParseMode.MARKDOWN,
         )
 
+        # 进度消息的编辑本身就能体现任务仍在进行，不再循环发送“正在输入”
         progress_cb = self._make_progress_cb(progress_msg, msg_count)
 
-        async def keep_typing():
-            while True:
-                try:
-                    await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
-                    await asyncio.sleep(4)
-                except Exception:
-                    break
-
-        typing_task = asyncio.create_task(keep_typing())
-
-        try:
-            result = await self.summarizer.summarize(hours=hours, save=True, progress_cb=progress_cb)
+        header = (
+            f"📝 群聊摘要\n\n"
+            f"📊 分析了 {msg_count} 条消息\n"
+            f"⏰ 时间范围: {actual_first} → {actual_last}\n"
+            f"🕐 查询跨度: 最近 {hours} 小时\n"
+            f"{_THIN_SEP}\n\n"
+        )
+        delivered = False
 
+        async def _deliver(result: str):
+            # 摘要一就绪就开始推送，不必等数据库保存完成
+            nonlocal delivered
+            delivered = True
+            progress_cb.cancel()
             try:
                 await progress_msg.delete()
             except Exception:
                 pass
+            await self._send_long_message(bot, chat_id, header + result)
 
-            header = (
-                f"📝 群聊摘要\n\n"
-                f"📊 分析了 {msg_count} 条消息\n"
-                f"⏰ 时间范围: {actual_first} → {actual_last}\n"
-                f"🕐 查询跨度: 最近 {hours} 小时\n"
-                f"{'─'*20}\n\n"
+        try:
+            result = await self.summarizer.summarize(
+                hours=hours, save=True, progress_cb=progress_cb, result_cb=_deliver,
             )
-
-            full_text = header + result
-            await self._send_long_message(bot, chat_id, full_text)
+            if not delivered:
+                await _deliver(result)
 
         except Exception as e:
             logger.error(f"摘要生成失败: {e}", exc_info=True)
@@ -81,8 +94,6 @@ class BotActionsMixin:
                 chat_id=chat_id,
                 text=f"❌ 摘要生成失败: {e}",
             )
-        finally:
-            typing_task.cancel()
 
     async def _do_stats(self, message, hours: int):
         await self._ensure_db()
@@ -94,8 +105,11 @@ class BotActionsMixin:
         now = datetime.now(timezone.utc)
         since = (now - timedelta(hours=hours)).isoformat(timespec='seconds')
 
-        stats = await self.db.get_stats(since=since)
-        top_senders = await self.db.get_top_senders(since=since, limit=5)
+        stats, top_senders, date_range = await asyncio.gather(
+            self.db.get_stats(since=since),
+            self.db.get_top_senders(since=since, limit=5),
+            self.db.get_date_range(since=since),
+        )
 
         if not stats:
             await bot.send_message(chat_id=chat_id, text="📭 暂无统计数据。")
@@ -104,30 +118,30 @@ class BotActionsMixin:
         total_msgs = sum(s["message_count"] for s in stats)
         total_users = sum(s["active_users"] for s in stats)
 
-        date_range = await self.db.get_date_range(since=since)
         actual_first = self._fmt_time(date_range.get("first_msg", ""))
         actual_last = self._fmt_time(date_range.get("last_msg", ""))
 
-        text = f"📊 *最近 {hours} 小时统计*\n\n"
-        text += f"📌 总消息数: *{total_msgs}*\n"
-        text += f"👥 总活跃用户: *{total_users}*\n"
-        text += f"📂 活跃群组: *{len(stats)}*\n"
-        text += f"⏰ 实际范围: {actual_first} → {actual_last}\n\n"
-
-        text += "━━━━━━━━━━━━━━━━━━━━\n"
+        parts = [
+            f"📊 *最近 {hours} 小时统计*\n\n",
+            f"📌 总消息数: *{total_msgs}*\n",
+            f"👥 总活跃用户: *{total_users}*\n",
+            f"📂 活跃群组: *{len(stats)}*\n",
+            f"⏰ 实际范围: {actual_first} → {actual_last}\n\n",
+            f"{_SEP}\n",
+        ]
         for s in stats:
             title = s.get("title") or f"群组{s['group_id']}"
-            text += f"▸ *{title}*\n"
-            text += f"  💬 {s['message_count']} 条 · 👤 {s['active_users']} 人\n"
+            parts.append(f"▸ *{title}*\n")
+            parts.append(f"  💬 {s['message_count']} 条 · 👤 {s['active_users']} 人\n")
 
         if top_senders:
-            text += "\n━━━━━━━━━━━━━━━━━━━━\n"
-            text += "🏆 *最活跃用户*\n\n"
-            medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
+            parts.append(f"\n{_SEP}\n")
+            parts.append("🏆 *最活跃用户*\n\n")
             for i, t in enumerate(top_senders):
-                name = t.get("sender_name") or "?"
-                text += f"{medals[i]} {name} — {t['msg_count']} 条\n"
+                name = t["sender_name"]
+                parts.append(f"{_MEDALS[i]} {name} — {t['msg_count']} 条\n")
 
+        text = "".join(parts)
         await self._send_long_message(bot, chat_id, text, ParseMode.MARKDOWN)
 
     async def _do_links(self, message, count: int):
@@ -138,64 +152,65 @@ class BotActionsMixin:
         try:
             await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
 
-            block_domains = self.config.get("filtering", {}).get(
-                "block_domains", 
-                ["t.me", "telegram.me", "telegram.org", "telegra.ph", "telegram.dog"]
-            )
-            
             links = await self.db.get_links_aggregated(
-                limit=count, 
-                block_domains=block_domains
+                limit=count,
+                block_domains=self._block_domains,
             )
 
             if not links:
                 await bot.send_message(chat_id=chat_id, text="📭 暂无链接记录。")
                 return
 
-            spam_links = [l for l in links if (l.get("group_count") or 0) > 1]
-            normal_links = [l for l in links if (l.get("group_count") or 0) <= 1]
+            spam_links, normal_links = [], []
+            for l in links:
+                (spam_links if l["group_count"] > 1 else normal_links).append(l)
 
-            lines = []
+            # 每条链接拼成一个完整文本块，块与块之间用空行分隔
+            sections = []
 
             if spam_links:
-                lines.append(f"🚨 跨群推广链接 ({len(spam_links)} 条)")
-                lines.append("以下链接出现在多个群中，疑似广告：\n")
+                blocks = []
                 for i, link in enumerate(spam_links, 1):
-                    url = link.get("url") or "?"
-                    total = link.get("total_count") or 0
-                    g_count = link.get("group_count") or 0
-                    groups = link.get("group_titles") or "?"
-                    senders = link.get("sender_names") or "?"
-                    first = self._fmt_time(link.get("first_seen") or "")
-                    last = self._fmt_time(link.get("last_seen") or "")
-
-                    lines.append(f"{i}. 🔗 {url}")
-                    lines.append(f"   📊 出现 {total} 次 · 涉及 {g_count} 个群")
-                    lines.append(f"   📌 群组: {groups}")
-                    lines.append(f"   👤 发送者: {senders}")
-                    lines.append(f"   🕐 {first} → {last}")
-                    lines.append("")
+                    # 聚合查询已用 COALESCE 兜底，各列均非 NULL，直接取值
+                    url = link["url"]
+                    total = link["total_count"]
+                    g_count = link["group_count"]
+                    groups = link["group_titles"]
+                    senders = link["sender_names"]
+                    first = self._fmt_time(link["first_seen"])
+                    last = self._fmt_time(link["last_seen"])
+                    blocks.append(
+                        f"{i}. 🔗 {url}\n"
+                        f"   📊 出现 {total} 次 · 涉及 {g_count} 个群\n"
+                        f"   📌 群组: {groups}\n"
+                        f"   👤 发送者: {senders}\n"
+                        f"   🕐 {first} → {last}"
+                    )
+                sections.append(
+                    f"🚨 跨群推广链接 ({len(spam_links)} 条)\n"
+                    f"以下链接出现在多个群中，疑似广告：\n\n" + "\n\n".join(blocks)
+                )
 
             if normal_links:
-                start_idx = len(spam_links) + 1
-                if spam_links:
-                    lines.append("━" * 20)
-                lines.append(f"🔗 其他链接 ({len(normal_links)} 条)\n")
-                for i, link in enumerate(normal_links, start_idx):
-                    url = link.get("url") or "?"
-                    total = link.get("total_count") or 0
-                    groups = link.get("group_titles") or "?"
-                    senders = link.get("sender_names") or "?"
-                    last = self._fmt_time(link.get("last_seen") or "")
-
-                    lines.append(f"{i}. 🔗 {url}")
-                    if total > 1:
-                        lines.append(f"   📊 出现 {total} 次")
-                    lines.append(f"   📌 {groups} · 👤 {senders}")
-                    lines.append(f"   🕐 {last}")
-                    lines.append("")
-
-            text = "\n".join(lines)
+                blocks = []
+                for i, link in enumerate(normal_links, len(spam_links) + 1):
+                    url = link["url"]
+                    total = link["total_count"]
+                    groups = link["group_titles"]
+                    senders = link["sender_names"]
+                    last = self._fmt_time(link["last_seen"])
+                    count_line = f"   📊 出现 {total} 次\n" if total > 1 else ""
+                    blocks.append(
+                        f"{i}. 🔗 {url}\n"
+                        f"{count_line}"
+                        f"   📌 {groups} · 👤 {senders}\n"
+                        f"   🕐 {last}"
+                    )
+                sections.append(
+                    f"🔗 其他链接 ({len(normal_links)} 条)\n\n" + "\n\n".join(blocks)
+                )
+
+            text = f"\n\n{_SEP}\n".join(sections)
             await self._send_long_message(bot, chat_id, text)
 
         except Exception as e:
@@ -205,7 +220,10 @@ class BotActionsMixin:
                 text=f"❌ 链接查询出错: {e}",
             )
 
-    async def _do_search(self, message, keyword: str, page: int = 0, edit: bool = False):
+    async def _do_search(
+        self, message, keyword: str, page: int = 0, edit: bool = False,
+        user_data: Optional[dict] = None,
+    ):
         await self._ensure_db()
         chat_id = message.chat_id
         bot = message.get_bot()
@@ -213,9 +231,34 @@ class BotActionsMixin:
         await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
 
         PAGE_SIZE = 10
-        all_results = await self.db.search_messages(keyword, limit=PAGE_SIZE * 6)
-
-        if not all_results:
+        # 总数与已查询过的页缓存在 user_data 中：新搜索入口（cmd_search / 文本搜索）先丢弃旧缓存，
+        # 翻页（含翻回第一页）时同一关键词且未过期则直接复用，来回翻页不再重复查库
+        cache = user_data.get("search_cache") if user_data is not None else None
+        if (
+            cache is None or cache["kw"] != keyword
+            or time.monotonic() - cache["ts"] > SEARCH_CACHE_TTL
+        ):
+            cache = {
+                "kw": keyword,
+                "ts": time.monotonic(),
+                "total": await self.db.count_search_messages(keyword),
+                "pages": {},
+            }
+            if user_data is not None:
+                user_data["search_cache"] = cache
+
+        total = cache["total"]
+        total_pages = max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+        page = min(page, total_pages - 1)
+        rows = cache["pages"].get(page)
+        if rows is None:
+            # 多取一条用于判断是否还有下一页
+            rows = await self.db.search_messages(
+                keyword, limit=PAGE_SIZE + 1, offset=page * PAGE_SIZE
+            ) if total else []
+            cache["pages"][page] = rows
+
+        if not rows:
             msg = f'🔍 未找到包含 "{keyword}" 的消息。'
             if edit:
                 await message.edit_text(msg)
@@ -223,31 +266,29 @@ class BotActionsMixin:
                 await bot.send_message(chat_id=chat_id, text=msg)
             return
 
-        total = len(all_results)
-        total_pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
-        page = min(page, total_pages - 1)
-        page_results = all_results[page * PAGE_SIZE : (page + 1) * PAGE_SIZE]
-
-        text = f'🔍 *搜索: "{keyword}"*\n'
-        text += f'第 {page + 1}/{total_pages} 页，共 {total} 条结果\n\n'
+        has_next = len(rows) > PAGE_SIZE
+        page_results = rows[:PAGE_SIZE]
 
+        parts = [
+            f'🔍 *搜索: "{keyword}"*\n',
+            f'第 {page + 1}/{total_pages} 页，共 {total} 条结果\n\n',
+        ]
         for msg in page_results:
             date = self._fmt_time(msg.get("date", ""))
             group = msg.get("group_title") or f"群组{msg['group_id']}"
             sender = msg.get("sender_name") or "?"
             msg_text = (msg.get("text") or "")[:100]
-            text += f"`{date}` [{group}]\n"
-            text += f"👤 {sender}: {msg_text}\n\n"
+            parts.append(f"`{date}` [{group}]\n")
+            parts.append(f"👤 {sender}: {msg_text}\n\n")
+        text = "".join(parts)
 
-        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
         nav_buttons = []
         if page > 0:
             nav_buttons.append(InlineKeyboardButton("◀️ 上一页", callback_data=f"search_page_{page - 1}"))
-        if page < total_pages - 1:
+        if has_next:
             nav_buttons.append(InlineKeyboardButton("下一页 ▶️", callback_data=f"search_page_{page + 1}"))
-        keyboard = [nav_buttons] if nav_buttons else []
-        keyboard.append([InlineKeyboardButton("◀️ 返回", callback_data="back_main")])
-        markup = InlineKeyboardMarkup(keyboard)
+        # 只有一页时直接复用预构建的返回键盘
+        markup = InlineKeyboardMarkup([nav_buttons, _BACK_ROW]) if nav_buttons else _BACK_MARKUP
 
         send_kwargs = dict(text=text, parse_mode=ParseMode.MARKDOWN, reply_markup=markup)
         if edit:
@@ -269,46 +310,40 @@ class BotActionsMixin:
             parse_mode=ParseMode.MARKDOWN,
         )
 
-        msg_count_24h = await self.db.get_message_count(
-            since=(datetime.now(timezone.utc) - timedelta(hours=24)).isoformat(timespec='seconds')
-        )
-        progress_cb = self._make_progress_cb(progress_msg, msg_count_24h)
-
-        async def keep_typing():
-            while True:
-                try:
-                    await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
-                    await asyncio.sleep(4)
-                except Exception:
-                    break
-
-        typing_task = asyncio.create_task(keep_typing())
+        now = datetime.now(timezone.utc)
+        since_24h = (now - timedelta(hours=24)).isoformat(timespec='seconds')
+        msg_count = await self.db.get_message_count(since=since_24h)
+        # 进度消息的编辑本身就能体现任务仍在进行，不再循环发送“正在输入”
+        progress_cb = self._make_progress_cb(progress_msg, msg_count)
 
-        try:
-            result = await self.summarizer.summarize_per_group(hours=24, save=True, progress_cb=progress_cb)
+        header = (
+            f"📋 *每日报告*\n\n"
+            f"📊 过去 24 小时共 {msg_count} 条消息\n"
+            f"{_SEP}\n\n"
+        )
+        delivered = False
 
+        async def _deliver(result: str):
+            # 报告一就绪就开始推送，与保存并发
+            nonlocal delivered
+            delivered = True
+            progress_cb.cancel()
             try:
                 await progress_msg.delete()
             except Exception:
                 pass
+            await self._send_long_message(bot, chat_id, header + result)
 
-            msg_count = await self.db.get_message_count(
-                since=(datetime.now(timezone.utc) - timedelta(hours=24)).isoformat(timespec='seconds')
-            )
-
-            header = (
-                f"📋 *每日报告*\n\n"
-                f"📊 过去 24 小时共 {msg_count} 条消息\n"
-                f"━━━━━━━━━━━━━━━━━━━━\n\n"
+        try:
+            result = await self.summarizer.summarize_per_group(
+                hours=24, save=True, progress_cb=progress_cb, result_cb=_deliver,
             )
-
-            await self._send_long_message(bot, chat_id, header + result)
+            if not delivered:
+                await _deliver(result)
 
         except Exception as e:
             logger.error(f"报告生成失败: {e}", exc_info=True)
             await bot.send_message(chat_id=chat_id, text=f"❌ 报告生成失败: {e}")
-        finally:
-            typing_task.cancel()
 
     async def _do_history(self, message):
         await self._ensure_db()
@@ -342,21 +377,21 @@ class BotActionsMixin:
         chat_id = message.chat_id
         bot = message.get_bot()
 
-        groups = await self.db.get_groups()
-        total_msgs = await self.db.get_message_count()
-
+        # 同一个 now 同时用于"最近1小时"窗口和采集延迟判断，保证两者口径一致
         now = datetime.now(timezone.utc)
-        recent_count = await self.db.get_message_count(
-            since=(now - timedelta(hours=1)).isoformat(timespec='seconds')
+        since_1h = (now - timedelta(hours=1)).isoformat(timespec='seconds')
+        groups, total_msgs, recent_count, date_range = await asyncio.gather(
+            self.db.get_groups(),
+            self.db.get_message_count(),
+            self.db.get_message_count(since=since_1h),
+            self.db.get_date_range(),
         )
-
-        date_range = await self.db.get_date_range()
         last_msg_time = self._fmt_time(date_range.get("last_msg", ""))
         last_msg_raw = date_range.get("last_msg", "")
         collector_ok = True
         if last_msg_raw:
             try:
-                last_dt = datetime.fromisoformat(last_msg_raw.replace("Z", "+00:00"))
+                last_dt = _parse_iso(last_msg_raw)
                 if last_dt.tzinfo is None:
                     last_dt = last_dt.replace(tzinfo=timezone.utc)
                 gap_min = (now - last_dt).total_seconds() / 60
@@ -372,15 +407,13 @@ class BotActionsMixin:
             f"💬 总消息量: {total_msgs} 条\n"
             f"⏰ 最近1小时: {recent_count} 条新消息\n"
             f"🕐 最新消息: {last_msg_time}\n"
-            f"🤖 AI 模型: `{self.config.get('ai', {}).get('model', '?')}`\n"
+            f"🤖 AI 模型: `{self._ai_model}`\n"
             f"📡 Collector: {status_icon}\n"
         )
 
-        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-        keyboard = [[InlineKeyboardButton("◀️ 返回", callback_data="back_main")]]
         await bot.send_message(
             chat_id=chat_id,
             text=text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=_BACK_MARKUP,
             parse_mode=ParseMode.MARKDOWN,
         )
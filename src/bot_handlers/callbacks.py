@@ -1,64 +1,121 @@
 from telegram import Update
-from telegram.ext import ContextTypes
+from telegram.ext import CallbackQueryHandler, ContextTypes
 from telegram.constants import ParseMode
 
 class BotCallbacksMixin:
     """提供内联键盘回调按钮处理"""
 
-    async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    __slots__ = ()
+
+    def build_callback_handlers(self) -> list:
+        """
+        带参数的回调按正则注册为独立 handler（由 PTB 匹配并提取参数），
+        其余固定按钮统一交给 handle_callback 查表分发。
+        """
+        handlers = [
+            CallbackQueryHandler(self._wrap_callback(route), pattern=pattern)
+            for pattern, route in self._CB_PATTERNS
+        ]
+        handlers.append(CallbackQueryHandler(self.handle_callback))
+        return handlers
+
+    def _wrap_callback(self, route):
+        async def _entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = await self._accept_callback(update)
+            if query is not None:
+                await route(self, query, context, int(context.matches[0].group(1)))
+        return _entry
+
+    async def _accept_callback(self, update: Update):
+        """应答回调并校验权限，无权限时返回 None"""
         query = update.callback_query
         await query.answer()
 
         if not self._is_owner(query.from_user.id):
             await query.edit_message_text("⛔ 你没有权限。")
+            return None
+        return query
+
+    async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = await self._accept_callback(update)
+        if query is None:
             return
 
-        data = query.data
-
-        if data == "menu_summary":
-            await self._show_time_picker_edit(query.message, "summary")
-        elif data == "menu_stats":
-            await self._show_time_picker_edit(query.message, "stats")
-        elif data == "menu_links":
-            await self._show_links_picker(query.message)
-        elif data == "menu_search":
-            await query.edit_message_text(
-                "🔍 请直接发送搜索关键词，或使用命令：\n"
-                "`/search 关键词`",
-                parse_mode=ParseMode.MARKDOWN,
+        handler = self._CB_EXACT.get(query.data)
+        if handler is not None:
+            await handler(self, query, context)
+
+    # ─── 精确匹配路由 ───
+
+    async def _cb_menu_summary(self, query, context):
+        await self._show_time_picker_edit(query.message, "summary")
+
+    async def _cb_menu_stats(self, query, context):
+        await self._show_time_picker_edit(query.message, "stats")
+
+    async def _cb_menu_links(self, query, context):
+        await self._show_links_picker(query.message)
+
+    async def _cb_menu_search(self, query, context):
+        await query.edit_message_text(
+            "🔍 请直接发送搜索关键词，或使用命令：\n"
+            "`/search 关键词`",
+            parse_mode=ParseMode.MARKDOWN,
+        )
+        context.user_data["waiting_search"] = True
+
+    async def _cb_action_report(self, query, context):
+        await query.edit_message_text("⏳ 正在生成每日报告...")
+        await self._do_report(query.message)
+
+    async def _cb_action_history(self, query, context):
+        await self._do_history(query.message)
+
+    async def _cb_action_status(self, query, context):
+        await self._do_status(query.message)
+
+    async def _cb_back_main(self, query, context):
+        await self._show_main_menu_edit(query.message)
+
+    # ─── 参数路由（参数由注册时的正则提取） ───
+
+    async def _cb_summary(self, query, context, hours: int):
+        await query.edit_message_text(f"⏳ 正在生成最近 {hours} 小时的摘要...")
+        await self._do_summary(query.message, hours)
+
+    async def _cb_stats(self, query, context, hours: int):
+        await query.edit_message_text(f"⏳ 正在统计最近 {hours} 小时的数据...")
+        await self._do_stats(query.message, hours)
+
+    async def _cb_links(self, query, context, count: int):
+        await query.edit_message_text(f"⏳ 正在获取最近 {count} 条链接...")
+        await self._do_links(query.message, count)
+
+    async def _cb_search_page(self, query, context, page: int):
+        keyword = context.user_data.get("last_search_keyword", "")
+        if keyword:
+            await self._do_search(
+                query.message, keyword, page=page, edit=True,
+                user_data=context.user_data,
             )
-            context.user_data["waiting_search"] = True
-
-        elif data.startswith("summary_"):
-            hours = int(data.rsplit("_", 1)[-1])
-            await query.edit_message_text(f"⏳ 正在生成最近 {hours} 小时的摘要...")
-            await self._do_summary(query.message, hours)
-
-        elif data.startswith("stats_"):
-            hours = int(data.rsplit("_", 1)[-1])
-            await query.edit_message_text(f"⏳ 正在统计最近 {hours} 小时的数据...")
-            await self._do_stats(query.message, hours)
-
-        elif data.startswith("links_"):
-            count = int(data.rsplit("_", 1)[-1])
-            await query.edit_message_text(f"⏳ 正在获取最近 {count} 条链接...")
-            await self._do_links(query.message, count)
-
-        elif data == "action_report":
-            await query.edit_message_text("⏳ 正在生成每日报告...")
-            await self._do_report(query.message)
-        elif data == "action_history":
-            await self._do_history(query.message)
-        elif data == "action_status":
-            await self._do_status(query.message)
-
-        elif data == "back_main":
-            await self._show_main_menu_edit(query.message)
-
-        elif data.startswith("search_page_"):
-            page = int(data.rsplit("_", 1)[-1])
-            keyword = context.user_data.get("last_search_keyword", "")
-            if keyword:
-                await self._do_search(query.message, keyword, page=page, edit=True)
-            else:
-                await query.edit_message_text("⚠️ 搜索关键词已过期，请重新搜索。")
+        else:
+            await query.edit_message_text("⚠️ 搜索关键词已过期，请重新搜索。")
+
+    # 路由表在类定义时构建一次（值为未绑定函数，调用时显式传入 self）
+    _CB_EXACT = {
+        "menu_summary": _cb_menu_summary,
+        "menu_stats": _cb_menu_stats,
+        "menu_links": _cb_menu_links,
+        "menu_search": _cb_menu_search,
+        "action_report": _cb_action_report,
+        "action_history": _cb_action_history,
+        "action_status": _cb_action_status,
+        "back_main": _cb_back_main,
+    }
+
+    _CB_PATTERNS = (
+        (r"^summary_(\d+)$", _cb_summary),
+        (r"^stats_(\d+)$", _cb_stats),
+        (r"^links_(\d+)$", _cb_links),
+        (r"^search_page_(\d+)$", _cb_search_page),
+    )
@@ -1,8 +1,25 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.constants import ParseMode, ChatAction
+from telegram.constants import ParseMode
+from telegram.error import RetryAfter
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 import asyncio
 import html
+import logging
+import re
+import time
+from typing import Iterator
+
+logger = logging.getLogger("tg-monitor.bot.utils")
+
+# 单个聊天的发送速率上限（Telegram 建议同一聊天约 20 条/分钟）
+CHAT_RATE_PER_MIN = 20
+# 同一聊天相邻两条消息的最小间隔（Telegram 建议单聊天不超过 1 条/秒）
+CHAT_MIN_INTERVAL = 1.05
+# 全局发送速率上限（Bot API 约 30 条/秒，留出余量）
+GLOBAL_RATE_PER_SEC = 28
+# 进度消息编辑的最小间隔（秒）
+PROGRESS_EDIT_INTERVAL = 2.0
 
 HOURS_OPTIONS = [
     ("最近 3 小时", 3),
@@ -14,144 +31,378 @@ HOURS_OPTIONS = [
     ("全部消息", 720),
 ]
 
+_BJ_TZ = timezone(timedelta(hours=8))
+
+# 代码围栏标记及其信息串（语言名），用于分段时跟踪围栏开闭状态
+_FENCE_RE = re.compile(r"```([^\n`]*)")
+_FENCE_CLOSE = "\n```"
+
+
+def _parse_iso(iso_str: str) -> datetime:
+    """
+    解析 ISO 时间。先直接 fromisoformat（3.11+ 原生支持 `Z`），
+    仅在失败且以 `Z` 结尾时改写后缀重试，避免对每个时间戳都做一次全串 replace。
+    """
+    try:
+        return datetime.fromisoformat(iso_str)
+    except ValueError:
+        if iso_str.endswith("Z"):
+            return datetime.fromisoformat(iso_str[:-1] + "+00:00")
+        raise
+
+
+@lru_cache(maxsize=4096)
+def _fmt_time_cached(iso_str: str) -> str:
+    """ISO 时间 → 北京时间 `MM-DD HH:MM`（纯函数，重复时间戳直接命中缓存）"""
+    if not iso_str:
+        return "?"
+    try:
+        dt = _parse_iso(iso_str)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(_BJ_TZ).strftime("%m-%d %H:%M")
+    except Exception:
+        return iso_str[:16].replace("T", " ")
+
+
+# 进度条只有 11 种形态（0~10 格），连同百分比一起预先生成
+_PROGRESS_BARS = tuple("■" * i + "□" * (10 - i) for i in range(11))
+_PROGRESS_LINES = tuple(f"进度: |{bar}| {i * 10}%\n状态: " for i, bar in enumerate(_PROGRESS_BARS))
+
+# 键盘布局是固定的，导入时一次性构建（InlineKeyboardMarkup 为不可变对象，可安全复用）
+_BACK_ROW = (InlineKeyboardButton("◀️ 返回", callback_data="back_main"),)
+_BACK_MARKUP = InlineKeyboardMarkup([_BACK_ROW])
+
+_MAIN_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📝 智能摘要", callback_data="menu_summary"),
+        InlineKeyboardButton("📊 群组统计", callback_data="menu_stats"),
+    ],
+    [
+        InlineKeyboardButton("🔗 最新链接", callback_data="menu_links"),
+        InlineKeyboardButton("🔍 搜索消息", callback_data="menu_search"),
+    ],
+    [
+        InlineKeyboardButton("📋 每日报告", callback_data="action_report"),
+        InlineKeyboardButton("📜 历史摘要", callback_data="action_history"),
+    ],
+    [InlineKeyboardButton("ℹ️ 系统状态", callback_data="action_status")],
+])
+
+
+def _pack_time_keyboard(action: str) -> InlineKeyboardMarkup:
+    keyboard = []
+    row = []
+    for label, hours in HOURS_OPTIONS:
+        row.append(InlineKeyboardButton(label, callback_data=f"{action}_{hours}"))
+        if len(row) == 2:
+            keyboard.append(row)
+            row = []
+    if row:
+        keyboard.append(row)
+    keyboard.append(_BACK_ROW)
+    return InlineKeyboardMarkup(keyboard)
+
+
+_TIME_MARKUPS = {action: _pack_time_keyboard(action) for action in ("summary", "stats")}
+_TIME_TITLES = {
+    "summary": "*📝 选择摘要时间范围：*",
+    "stats": "*📊 选择统计时间范围：*",
+}
+
+_LINKS_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("最近 10 条", callback_data="links_10"),
+        InlineKeyboardButton("最近 20 条", callback_data="links_20"),
+    ],
+    [
+        InlineKeyboardButton("最近 50 条", callback_data="links_50"),
+        InlineKeyboardButton("最近 100 条", callback_data="links_100"),
+    ],
+    _BACK_ROW,
+])
+
+
+class TokenBucket:
+    """
+    异步令牌桶限流器：按固定速率补充令牌，令牌不足时等待。
+    min_interval > 0 时，即使桶内有余量，相邻两次放行也至少间隔该秒数（平滑突发）。
+    """
+
+    __slots__ = ("rate", "capacity", "min_interval", "_tokens", "_updated", "_last_grant", "_lock")
+
+    def __init__(self, rate: float, capacity: int, min_interval: float = 0.0):
+        self.rate = rate  # 每秒补充的令牌数
+        self.capacity = capacity
+        self.min_interval = min_interval
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._last_grant = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                gap = self._last_grant + self.min_interval - now
+                if gap > 0:
+                    await asyncio.sleep(gap)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._last_grant = now
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
 class BotUtilsMixin:
     """提供 UI 构建、时间转换、长文本分段等辅助方法"""
 
+    # 不引入实例 __dict__，由 MonitorBot 统一声明 __slots__
+    __slots__ = ()
+
     @staticmethod
     def _build_main_keyboard() -> InlineKeyboardMarkup:
-        return InlineKeyboardMarkup([
-            [
-                InlineKeyboardButton("📝 智能摘要", callback_data="menu_summary"),
-                InlineKeyboardButton("📊 群组统计", callback_data="menu_stats"),
-            ],
-            [
-                InlineKeyboardButton("🔗 最新链接", callback_data="menu_links"),
-                InlineKeyboardButton("🔍 搜索消息", callback_data="menu_search"),
-            ],
-            [
-                InlineKeyboardButton("📋 每日报告", callback_data="action_report"),
-                InlineKeyboardButton("📜 历史摘要", callback_data="action_history"),
-            ],
-            [InlineKeyboardButton("ℹ️ 系统状态", callback_data="action_status")],
-        ])
+        return _MAIN_MARKUP
 
     @staticmethod
     def _build_time_keyboard(action: str) -> InlineKeyboardMarkup:
-        keyboard = []
-        row = []
-        for label, hours in HOURS_OPTIONS:
-            row.append(InlineKeyboardButton(label, callback_data=f"{action}_{hours}"))
-            if len(row) == 2:
-                keyboard.append(row)
-                row = []
-        if row:
-            keyboard.append(row)
-        keyboard.append([InlineKeyboardButton("◀️ 返回", callback_data="back_main")])
-        return InlineKeyboardMarkup(keyboard)
+        return _TIME_MARKUPS[action]
 
     async def _show_main_menu_edit(self, message):
-        await message.edit_text(
+        await self._edit_one(
+            message,
             "🔍 *TG Monitor — 群聊监控助手*\n\n选择你需要的功能：",
+            paced=False,
             reply_markup=self._build_main_keyboard(),
             parse_mode=ParseMode.MARKDOWN,
         )
 
     async def _show_time_picker(self, message, action: str):
-        title = "📝 选择摘要时间范围" if action == "summary" else "📊 选择统计时间范围"
         await message.reply_text(
-            f"*{title}：*",
+            _TIME_TITLES[action],
             reply_markup=self._build_time_keyboard(action),
             parse_mode=ParseMode.MARKDOWN,
         )
 
     async def _show_time_picker_edit(self, message, action: str):
-        title = "📝 选择摘要时间范围" if action == "summary" else "📊 选择统计时间范围"
-        await message.edit_text(
-            f"*{title}：*",
+        await self._edit_one(
+            message,
+            _TIME_TITLES[action],
+            paced=False,
             reply_markup=self._build_time_keyboard(action),
             parse_mode=ParseMode.MARKDOWN,
         )
 
     async def _show_links_picker(self, message):
-        keyboard = [
-            [
-                InlineKeyboardButton("最近 10 条", callback_data="links_10"),
-                InlineKeyboardButton("最近 20 条", callback_data="links_20"),
-            ],
-            [
-                InlineKeyboardButton("最近 50 条", callback_data="links_50"),
-                InlineKeyboardButton("最近 100 条", callback_data="links_100"),
-            ],
-            [InlineKeyboardButton("◀️ 返回", callback_data="back_main")],
-        ]
-        await message.edit_text(
+        await self._edit_one(
+            message,
             "*🔗 选择要查看的链接数量：*",
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            paced=False,
+            reply_markup=_LINKS_MARKUP,
             parse_mode=ParseMode.MARKDOWN,
         )
 
     def _fmt_time(self, iso_str: str) -> str:
-        if not iso_str:
-            return "?"
-        try:
-            dt = datetime.fromisoformat(iso_str)
-            bj_tz = timezone(timedelta(hours=8))
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            dt_bj = dt.astimezone(bj_tz)
-            return dt_bj.strftime("%m-%d %H:%M")
-        except Exception:
-            return iso_str[:16].replace("T", " ")
+        return _fmt_time_cached(iso_str)
 
     @staticmethod
     def _esc_html(text: str) -> str:
         return html.escape(str(text)) if text else "?"
 
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        """获取（必要时创建）某个聊天的发送令牌桶"""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(
+                rate=CHAT_RATE_PER_MIN / 60,
+                capacity=CHAT_RATE_PER_MIN,
+                min_interval=CHAT_MIN_INTERVAL,
+            )
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _global_acquire(self, bot):
+        """
+        全局限流：Application 已挂 AIORateLimiter 时由 PTB 统一处理，
+        否则用本地令牌桶兜底（首次使用时在事件循环内创建）
+        """
+        if getattr(bot, "rate_limiter", None) is not None:
+            return
+        if self._global_bucket is None:
+            self._global_bucket = TokenBucket(
+                rate=GLOBAL_RATE_PER_SEC, capacity=GLOBAL_RATE_PER_SEC,
+            )
+        await self._global_bucket.acquire()
+
+    async def _send_one(
+        self, bot, chat_id: int, text: str, parse_mode=None, *, acquired: bool = False, **kwargs,
+    ):
+        """
+        限流发送单条消息；遇到 429 按服务端给出的 retry_after 等待后重试。
+        acquired=True 表示调用方已为首次尝试取得聊天令牌。
+        """
+        for attempt in range(3):
+            if attempt or not acquired:
+                await self._chat_bucket(chat_id).acquire()
+            await self._global_acquire(bot)
+            try:
+                return await bot.send_message(
+                    chat_id=chat_id, text=text, parse_mode=parse_mode, **kwargs
+                )
+            except RetryAfter as e:
+                if attempt == 2:
+                    raise
+                await self._wait_retry_after(e)
+
+    async def _edit_one(self, message, text: str, parse_mode=None, *, paced: bool = True, **kwargs):
+        """
+        编辑消息，遇到 429 等待后重试一次。
+        paced=True（进度等批量编辑）时与发送共用同一聊天令牌桶和全局限流，按到达顺序排队；
+        用户点按触发的菜单编辑传 paced=False，不排队等令牌，避免每次点击都卡顿。
+        """
+        for attempt in range(2):
+            if paced:
+                await self._chat_bucket(message.chat_id).acquire()
+                await self._global_acquire(message.get_bot())
+            try:
+                return await message.edit_text(text, parse_mode=parse_mode, **kwargs)
+            except RetryAfter as e:
+                if attempt == 1:
+                    raise
+                await self._wait_retry_after(e)
+
+    @staticmethod
+    async def _wait_retry_after(e: RetryAfter):
+        delay = e.retry_after
+        if isinstance(delay, timedelta):
+            delay = delay.total_seconds()
+        logger.warning(f"⚠️ 触发 Telegram 限流，{delay}s 后重试")
+        await asyncio.sleep(delay)
+
+    @staticmethod
+    def _chunk_text(text: str, limit: int) -> Iterator[str]:
+        """
+        按段落感知的方式切分长文本，逐段产出（生成器，不预先生成整份列表）：
+        优先在窗口后半部分的空行处断开，其次换行、空格，都没有时按 limit 硬切，
+        断点处的分隔符本身丢弃；硬切时退到反引号串 / 围栏标记之前，不会把 ```lang 拆开。
+        段尾仍处于代码围栏内时补一个闭合围栏，下一段开头用相同的信息串（语言名）重新打开，
+        保证每段的 Markdown 都能被 Telegram 正常解析；补上的围栏计入 limit。
+        """
+        i = 0
+        n = len(text)
+        fence_info = None  # 当前未闭合围栏的信息串；None 表示不在围栏内
+        while i < n:
+            prefix = "" if fence_info is None else f"```{fence_info}\n"
+            # 为重新打开与补闭合的围栏预留长度
+            window = max(limit - len(prefix) - len(_FENCE_CLOSE), 1)
+            if n - i <= window:
+                body = text[i:]
+                i = n
+            else:
+                lo = i + window // 2
+                for sep in ("\n\n", "\n", " "):
+                    j = text.rfind(sep, lo, i + window + len(sep))
+                    if j != -1:
+                        body = text[i:j]
+                        i = j + len(sep)
+                        break
+                else:
+                    # 硬切点不落在反引号串中间，也不切开 ``` 及其信息串
+                    cut = i + window
+                    if text[cut] == "`":
+                        while cut > i and text[cut - 1] == "`":
+                            cut -= 1
+                    k = text.rfind("```", i, cut)
+                    if k != -1 and _FENCE_RE.match(text, k).end() > cut:
+                        cut = k
+                    if cut == i:
+                        cut = i + window
+                    body = text[i:cut]
+                    i = cut
+            if not body.strip():
+                continue
+            for m in _FENCE_RE.finditer(body):
+                fence_info = m.group(1).strip() if fence_info is None else None
+            chunk = prefix + body
+            if fence_info is not None:
+                chunk += _FENCE_CLOSE
+            yield chunk
+
     async def _send_long_message(self, bot, chat_id: int, text: str, parse_mode=None):
+        # 低于 Telegram 的 4096 上限，为补齐代码围栏留出余量
         MAX_LEN = 4000
         if len(text) <= MAX_LEN:
-            await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+            await self._send_one(bot, chat_id, text, parse_mode)
             return
 
-        parts = []
-        current = ""
-        for line in text.split("\n"):
-            if len(current) + len(line) + 1 > MAX_LEN:
-                parts.append(current)
-                current = line
-            else:
-                current += "\n" + line if current else line
-        if current:
-            parts.append(current)
-
-        for i, part in enumerate(parts):
-            if i > 0:
-                await asyncio.sleep(0.5)
-            await bot.send_message(chat_id=chat_id, text=part, parse_mode=parse_mode)
+        # 分段必须按顺序到达：上一段仍在发送时先等下一段的令牌，
+        # 令牌到手且上一段已送达后再发下一段，限速等待与网络往返重叠进行
+        bucket = self._chat_bucket(chat_id)
+        in_flight = None
+        for part in self._chunk_text(text, MAX_LEN):
+            await bucket.acquire()
+            if in_flight is not None:
+                await in_flight
+            in_flight = asyncio.create_task(
+                self._send_one(bot, chat_id, part, parse_mode, acquired=True)
+            )
+        if in_flight is not None:
+            await in_flight
 
     def _make_progress_cb(self, progress_msg, msg_count: int):
-        _last_edit_time = [0.0]
-        _EDIT_INTERVAL = 1.5
-        model_name = self.config.get("ai", {}).get("model", "?")
+        """
+        生成进度回调。回调只记录最新进度，由 call_later 定时器合并后统一编辑，
+        每个 PROGRESS_EDIT_INTERVAL 至多一次 edit；最终进度（current >= total）立即编辑。
+        返回的回调带有 cancel()，进度消息被删除前调用可丢弃未发出的编辑。
+        """
+        loop = asyncio.get_running_loop()
+        model_name = self._ai_model
+        header = (
+            f"🧠 *AI 摘要任务进行中*\n\n"
+            f"📊 消息数量: {msg_count} 条\n"
+            f"🤖 模型: `{model_name}`\n\n"
+        )
+        state = {"pending": None, "handle": None, "task": None, "last": 0.0}
 
-        async def _cb(text: str, current: int, total: int):
-            import time
-            now_t = time.monotonic()
-            if current < total and now_t - _last_edit_time[0] < _EDIT_INTERVAL:
-                return
-            _last_edit_time[0] = now_t
+        async def _edit(text: str, current: int, total: int):
             try:
-                filled = int((current / total) * 10)
-                bar = "■" * filled + "□" * (10 - filled)
-                status_text = (
-                    f"🧠 *AI 摘要任务进行中*\n\n"
-                    f"📊 消息数量: {msg_count} 条\n"
-                    f"🤖 模型: `{model_name}`\n\n"
-                    f"进度: |{bar}| {current * 10}%\n"
-                    f"状态: {text}"
+                filled = min(current * 10 // total, 10) if total else 10
+                await self._edit_one(
+                    progress_msg,
+                    f"{header}{_PROGRESS_LINES[filled]}{text}",
+                    parse_mode=ParseMode.MARKDOWN,
                 )
-                await progress_msg.edit_text(status_text, parse_mode=ParseMode.MARKDOWN)
             except Exception:
                 pass
 
+        def _flush():
+            state["handle"] = None
+            pending, state["pending"] = state["pending"], None
+            if pending is not None:
+                state["last"] = loop.time()
+                state["task"] = asyncio.create_task(_edit(*pending))
+
+        def _cancel():
+            if state["handle"] is not None:
+                state["handle"].cancel()
+                state["handle"] = None
+            state["pending"] = None
+
+        async def _cb(text: str, current: int, total: int):
+            if current >= total:
+                _cancel()
+                # 等上一次编辑落地，避免旧进度覆盖最终状态
+                if state["task"] is not None:
+                    await state["task"]
+                await _edit(text, current, total)
+                return
+            state["pending"] = (text, current, total)
+            if state["handle"] is None:
+                delay = max(0.0, state["last"] + PROGRESS_EDIT_INTERVAL - loop.time())
+                state["handle"] = loop.call_later(delay, _flush)
+
+        _cb.cancel = _cancel
         return _cb
@@ -5,22 +5,28 @@ CLI 命令行界面
 
 import asyncio
 import logging
+import re
+import sys
 from datetime import datetime, timezone, timedelta
-from pathlib import Path
+from typing import TYPE_CHECKING
 
 import click
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
-from rich.markdown import Markdown
-from rich.progress import Progress
 from rich import box
 
+try:
+    import uvloop
+except ImportError:  # Windows 或未安装 speed 可选依赖
+    uvloop = None
+
 from .config import load_config, validate_config
-from .database import Database
-from .collector import Collector
-from .summarizer import Summarizer
-from .session_pool import SessionPool
+
+# 数据库 / Telethon / AI 客户端等重依赖在各子命令内按需导入，
+# 让 `--help` 等轻量路径不必为它们付出导入开销
+if TYPE_CHECKING:
+    from .database import Database
 
 
 console = Console()
@@ -36,11 +42,26 @@ def setup_logging(verbose: bool = False):
 
 
 def run_async(coro):
-    """统一的异步运行入口"""
+    """统一的异步运行入口（可用时使用 uvloop，每个命令一个全新事件循环）"""
+    ctx = click.get_current_context(silent=True)
+    obj = ctx.find_object(dict) if ctx else None
+    if uvloop is None or (obj and obj.get("no_uvloop")):
+        return asyncio.run(coro)
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            return runner.run(coro)
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     return asyncio.run(coro)
 
 
-async def _get_db(config: dict) -> Database:
+def _short_time(iso_str) -> str:
+    """ISO 时间截到分钟，用于表格展示"""
+    return (iso_str or "")[:16].replace("T", " ")
+
+
+async def _get_db(config: dict) -> "Database":
+    from .database import Database
+
     db = Database(config["database"]["path"])
     await db.connect()
     return db
@@ -54,11 +75,13 @@ async def _get_db(config: dict) -> Database:
 @click.group()
 @click.option("--config", "-c", default=None, help="配置文件路径")
 @click.option("--verbose", "-v", is_flag=True, help="详细日志")
+@click.option("--no-uvloop", is_flag=True, help="禁用 uvloop，使用默认事件循环")
 @click.pass_context
-def cli(ctx, config, verbose):
+def cli(ctx, config, verbose, no_uvloop):
     """🔍 TG Monitor — Telegram 群聊监控 & 智能汇总"""
     setup_logging(verbose)
     ctx.ensure_object(dict)
+    ctx.obj["no_uvloop"] = no_uvloop
     try:
         cfg = load_config(config)
         ctx.obj["config"] = cfg
@@ -90,18 +113,29 @@ def start(ctx, fetch_history):
         raise SystemExit(1)
 
     async def _run():
+        from .collector import Collector
+
         db = await _get_db(cfg)
         collector = Collector(cfg, db)
         await collector.start()
 
-        if fetch_history > 0:
-            console.print(
-                f"\n[cyan]⏳ 正在拉取每个群的最近 {fetch_history} 条历史消息...[/cyan]"
-            )
-            total = await collector.fetch_history(limit=fetch_history)
-            console.print(f"[green]✅ 共拉取 {total} 条历史消息[/green]\n")
+        # 实时监听先行启动，历史拉取与之并发进行（写入由 Collector 的写锁串行化）
+        realtime = asyncio.create_task(collector.run_realtime())
+
+        try:
+            if fetch_history > 0:
+                console.print(
+                    f"\n[cyan]⏳ 正在拉取每个群的最近 {fetch_history} 条历史消息...[/cyan]"
+                )
+                total = await collector.fetch_history(limit=fetch_history)
+                console.print(f"[green]✅ 共拉取 {total} 条历史消息[/green]\n")
+        except BaseException:
+            # 历史拉取失败或被中断：先取消并等待实时监听退出，不留下孤儿任务
+            realtime.cancel()
+            await asyncio.gather(realtime, return_exceptions=True)
+            raise
 
-        await collector.run_realtime()
+        await realtime
 
     try:
         run_async(_run())
@@ -121,6 +155,8 @@ def pool_start(ctx):
     cfg = ctx.obj["config"]
 
     async def _run():
+        from .session_pool import SessionPool
+
         db_path = cfg["database"]["path"]
         pool = SessionPool(cfg, db_path)
         try:
@@ -159,6 +195,8 @@ def fetch(ctx, limit, group):
         raise SystemExit(1)
 
     async def _run():
+        from .collector import Collector
+
         db = await _get_db(cfg)
         collector = Collector(cfg, db)
         await collector.start()
@@ -190,6 +228,9 @@ def summary(ctx, hours, since, until, group, no_save):
     cfg = ctx.obj["config"]
 
     async def _run():
+        from rich.markdown import Markdown
+        from .summarizer import Summarizer
+
         db = await _get_db(cfg)
         summarizer = Summarizer(cfg, db)
 
@@ -232,6 +273,9 @@ def report(ctx):
     cfg = ctx.obj["config"]
 
     async def _run():
+        from rich.markdown import Markdown
+        from .summarizer import Summarizer
+
         db = await _get_db(cfg)
         summarizer = Summarizer(cfg, db)
 
@@ -280,20 +324,25 @@ def links(ctx, last, group):
             box=box.ROUNDED,
             show_lines=True
         )
+        # 截断交给 Rich 的列配置（按显示宽度计算，CJK 不会被截歪），行内只传原值
         table.add_column("时间", style="dim", width=16)
-        table.add_column("群组", style="cyan", width=15)
-        table.add_column("发送者", style="green", width=12)
-        table.add_column("链接", style="blue", max_width=60)
-        table.add_column("上下文", style="white", max_width=30)
-
-        for link in results:
-            table.add_row(
-                link["discovered_at"][:16].replace("T", " "),
-                link.get("group_title", str(link["group_id"]))[:15],
-                (link.get("sender_name") or "?")[:12],
-                link["url"][:60],
-                (link.get("context") or "")[:30] + "..." if link.get("context") else "",
+        table.add_column("群组", style="cyan", width=15, overflow="ellipsis", no_wrap=True)
+        table.add_column("发送者", style="green", width=12, overflow="ellipsis", no_wrap=True)
+        table.add_column("链接", style="blue", max_width=60, overflow="ellipsis", no_wrap=True)
+        table.add_column("上下文", style="white", max_width=30, overflow="ellipsis", no_wrap=True)
+
+        rows = [
+            (
+                _short_time(link["discovered_at"]),
+                link["group_title"] or str(link["group_id"]),
+                link["sender_name"] or "?",
+                link["url"],
+                link["context"] or "",
             )
+            for link in results
+        ]
+        for row in rows:
+            table.add_row(*row)
 
         console.print(table)
         await db.close()
@@ -325,16 +374,17 @@ def search(ctx, keyword, limit):
 
         console.print(f"[green]找到 {len(results)} 条匹配消息[/green]\n")
 
+        # 高亮关键词（忽略大小写，正则只编译一次）
+        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
+        repl = r"[bold yellow]\g<0>[/bold yellow]"
+
         for msg in results:
-            date = msg["date"][:16].replace("T", " ")
-            group = msg.get("group_title", f"群组{msg['group_id']}")
-            sender = msg.get("sender_name", "?")
-            text = msg.get("text", "")
-
-            # 高亮关键词
-            highlighted = text.replace(
-                keyword, f"[bold yellow]{keyword}[/bold yellow]"
-            )
+            date = _short_time(msg["date"])
+            group = msg.get("group_title") or f"群组{msg['group_id']}"
+            sender = msg.get("sender_name") or "?"
+            text = msg.get("text") or ""
+
+            highlighted = pattern.sub(repl, text) if len(text) >= len(keyword) else text
 
             console.print(
                 f"[dim]{date}[/dim] [cyan][{group}][/cyan] "
@@ -364,7 +414,11 @@ def stats(ctx, hours):
         now = datetime.now(timezone.utc)
         since = (now - timedelta(hours=hours)).isoformat(timespec='seconds')
 
-        results = await db.get_stats(since=since)
+        # 两个统计查询互不依赖，一起发出
+        results, top = await asyncio.gather(
+            db.get_stats(since=since),
+            db.get_top_senders(since=since, limit=5),
+        )
 
         if not results:
             console.print("[yellow]暂无统计数据[/yellow]")
@@ -381,22 +435,24 @@ def stats(ctx, hours):
         table.add_column("首条消息", style="dim")
         table.add_column("最新消息", style="dim")
 
-        total_msgs = 0
-        for s in results:
-            table.add_row(
-                s.get("title", str(s["group_id"])),
+        rows = [
+            (
+                s["title"] or str(s["group_id"]),
                 str(s["message_count"]),
                 str(s["active_users"]),
-                (s["first_msg"] or "")[:16].replace("T", " "),
-                (s["last_msg"] or "")[:16].replace("T", " "),
+                _short_time(s["first_msg"]),
+                _short_time(s["last_msg"]),
             )
-            total_msgs += s["message_count"]
+            for s in results
+        ]
+        for row in rows:
+            table.add_row(*row)
+        total_msgs = sum(s["message_count"] for s in results)
 
         console.print(table)
         console.print(f"\n[bold]总消息数: {total_msgs}[/bold]")
 
         # 显示 Top 发送者
-        top = await db.get_top_senders(since=since, limit=5)
         if top:
             console.print(f"\n[bold]🏆 最活跃用户:[/bold]")
             for i, t in enumerate(top, 1):
@@ -443,14 +499,18 @@ def groups_list(ctx):
         table.add_column("成员数", justify="right")
         table.add_column("更新时间", style="dim")
 
-        for g in groups:
-            table.add_row(
+        rows = [
+            (
                 str(g["id"]),
                 g["title"],
-                g.get("username") or "-",
-                str(g.get("member_count") or "-"),
-                (g["updated_at"] or "")[:16].replace("T", " "),
+                g["username"] or "-",
+                str(g["member_count"] or "-"),
+                _short_time(g["updated_at"]),
             )
+            for g in groups
+        ]
+        for row in rows:
+            table.add_row(*row)
 
         console.print(table)
 
@@ -498,22 +558,27 @@ def groups_scan(ctx):
         table.add_column("ID", style="green", width=15)
         table.add_column("Username", style="dim")
 
-        idx = 1
-        async for dialog in client.iter_dialogs():
+        # iter_dialogs 每次 getDialogs 请求已批量返回 100 个完整实体，无需再逐个 get_entity；
+        # 已升级为超级群的旧 Chat 的 ID 已失效，直接跳过
+        rows = []
+        async for dialog in client.iter_dialogs(ignore_migrated=True):
             entity = dialog.entity
-            if isinstance(entity, (Channel, Chat)):
-                dtype = "频道" if getattr(entity, "broadcast", False) else "群组"
-                table.add_row(
-                    str(idx),
-                    dtype,
-                    getattr(entity, "title", "?")[:28],
-                    str(entity.id),
-                    getattr(entity, "username", "") or "-",
-                )
-                idx += 1
+            # 按类型分派后直接取字段：Channel 带 broadcast/username，普通 Chat 两者都没有
+            if isinstance(entity, Channel):
+                dtype = "频道" if entity.broadcast else "群组"
+                uname = entity.username or "-"
+            elif isinstance(entity, Chat):
+                dtype = "群组"
+                uname = "-"
+            else:
+                continue
+            rows.append((dtype, (entity.title or "?")[:28], str(entity.id), uname))
+
+        for idx, row in enumerate(rows, 1):
+            table.add_row(str(idx), *row)
 
         console.print(table)
-        console.print(f"\n[dim]共 {idx - 1} 个群组/频道[/dim]")
+        console.print(f"\n[dim]共 {len(rows)} 个群组/频道[/dim]")
         console.print("[yellow]📌 将想要监控的群组 ID 添加到 config.yaml 中即可[/yellow]")
 
         await client.disconnect()
@@ -534,6 +599,8 @@ def history(ctx, last):
     cfg = ctx.obj["config"]
 
     async def _run():
+        from rich.markdown import Markdown
+
         db = await _get_db(cfg)
         summaries = await db.get_latest_summaries(limit=last)
 
@@ -23,6 +23,13 @@ from .alerts import AlertManager
 
 logger = logging.getLogger("tg-monitor.collector")
 
+# 历史/缺口回填每攒够这么多条就交给写入端，内存占用不随 limit 增长
+INSERT_CHUNK = 500
+# 回填写队列的最大积压块数（生产者超出时等待，形成背压）
+RECOVER_QUEUE_SIZE = 8
+# 默认同时回填的群组数（可由 monitoring.recover_concurrency 覆盖）
+RECOVER_CONCURRENCY = 4
+
 
 def _get_sender_name(sender) -> str:
     """从 sender 对象提取显示名"""
@@ -37,26 +44,37 @@ def _get_sender_name(sender) -> str:
     return str(getattr(sender, "id", "Unknown"))
 
 
+# 按 MIME 顶级类型归类文档
+_DOC_KIND_BY_TOP = {"video": "video", "audio": "audio"}
+
+
+def _document_media_type(media) -> str:
+    doc = media.document
+    if doc and doc.mime_type:
+        mime = doc.mime_type
+        kind = _DOC_KIND_BY_TOP.get(mime.partition("/")[0])
+        if kind:
+            return kind
+        if mime == "application/x-tgsticker":
+            return "sticker"
+        return f"document ({mime})"
+    return "document"
+
+
+# TL 类型都是具体的叶子类，按 type() 精确查表即可，无需逐个 isinstance
+_MEDIA_DISPATCH = {
+    MessageMediaPhoto: lambda media: "photo",
+    MessageMediaDocument: _document_media_type,
+    MessageMediaWebPage: lambda media: "webpage",
+}
+
+
 def _get_media_type(media) -> Optional[str]:
     """获取媒体类型"""
     if media is None:
         return None
-    if isinstance(media, MessageMediaPhoto):
-        return "photo"
-    if isinstance(media, MessageMediaDocument):
-        doc = media.document
-        if doc and doc.mime_type:
-            if "video" in doc.mime_type:
-                return "video"
-            if "audio" in doc.mime_type:
-                return "audio"
-            if "sticker" in doc.mime_type or doc.mime_type == "application/x-tgsticker":
-                return "sticker"
-            return f"document ({doc.mime_type})"
-        return "document"
-    if isinstance(media, MessageMediaWebPage):
-        return "webpage"
-    return type(media).__name__
+    handler = _MEDIA_DISPATCH.get(type(media))
+    return handler(media) if handler else type(media).__name__
 
 
 def _get_forward_info(fwd: Optional[MessageFwdHeader]) -> Optional[str]:
@@ -91,6 +109,8 @@ class Collector:
         self._last_msg_time: Optional[datetime] = None
         self._msg_queue: asyncio.Queue = asyncio.Queue()
         self._batch_task: Optional[asyncio.Task] = None
+        # 批量写入锁：实时写缓冲、历史拉取、缺口回填共用同一条连接，避免事务交错
+        self._write_lock = asyncio.Lock()
 
     async def start(self):
         """初始化 Telethon 客户端"""
@@ -127,9 +147,11 @@ class Collector:
             if date_range and date_range.get("last_msg"):
                 latest = date_range["last_msg"]
                 if isinstance(latest, str):
-                    latest = datetime.fromisoformat(
-                        latest.replace("Z", "+00:00")
-                    )
+                    # 库中时间由 isoformat() 写入（+00:00），只有旧数据/3.11 以下遇到 Z 后缀才需改写
+                    try:
+                        latest = datetime.fromisoformat(latest)
+                    except ValueError:
+                        latest = datetime.fromisoformat(latest.replace("Z", "+00:00"))
                 self._last_msg_time = latest
                 logger.info(
                     f"📋 数据库最新消息时间: "
@@ -157,16 +179,38 @@ class Collector:
             f"{gap_start.strftime('%H:%M:%S')} → "
             f"{now.strftime('%H:%M:%S')} ({gap_hours:.1f}h)，并发回填 {len(self._monitored_ids)} 个群组..."
         )
-        
-        # P1.3 修复：提供批量插入锁，避免在并发抓取时造成 SQLite 锁竞争
-        _db_lock = asyncio.Lock()
+
+        # 各群并发拉取，统一交给唯一的写入协程落库：
+        # 回填期间只有它与实时写缓冲争用写锁；队列有上限，内存不会随缺口大小膨胀
+        queue: asyncio.Queue = asyncio.Queue(maxsize=RECOVER_QUEUE_SIZE)
+        # 限制同时拉取的群组数，避免重连瞬间对 Telegram 并发过多请求触发 FloodWait
+        sem = asyncio.Semaphore(
+            self.config.get("monitoring", {}).get("recover_concurrency", RECOVER_CONCURRENCY)
+        )
+
+        async def _writer():
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    return
+                try:
+                    async with self._write_lock:
+                        await self.db.insert_messages_batch(chunk)
+                except Exception as e:
+                    logger.error(f"   ❌ 回填写入失败: {e}")
 
         async def _recover_one(gid: int) -> int:
             """recover a single group, return number of messages recovered"""
+            async with sem:
+                return await _recover_group(gid)
+
+        async def _recover_group(gid: int) -> int:
+            count = 0
             try:
                 entity = await self.client.get_entity(gid)
                 title = getattr(entity, "title", str(gid))
                 batch: list = []
+                senders: Dict[Any, Any] = {}
                 async for message in self.client.iter_messages(
                     entity,
                     offset_date=now,
@@ -176,24 +220,37 @@ class Collector:
                     msg_time = message.date.replace(tzinfo=timezone.utc)
                     if msg_time <= gap_start:
                         break
-                    msg_dict = await self._message_to_dict(message)
+                    msg_dict = await self._message_to_dict(
+                        message, chat=entity, sender_cache=senders,
+                    )
                     if msg_dict:
                         msg_dict["group_id"] = gid
                         batch.append(msg_dict)
+                        if len(batch) >= INSERT_CHUNK:
+                            await queue.put(batch)
+                            count += len(batch)
+                            batch = []
 
                 if batch:
-                    async with _db_lock:
-                        await self.db.insert_messages_batch(batch)
-                    logger.info(f"   ✅ [{title}] 回填 {len(batch)} 条")
-                return len(batch)
+                    await queue.put(batch)
+                    count += len(batch)
+                if count:
+                    logger.info(f"   ✅ [{title}] 回填 {count} 条")
+                return count
             except Exception as e:
                 logger.error(
                     f"   ❌ [{self._group_names.get(gid, gid)}] 回填失败: {e}"
                 )
-                return 0
+                return count
+
+        async def _produce_all():
+            try:
+                return await asyncio.gather(*[_recover_one(gid) for gid in self._monitored_ids])
+            finally:
+                await queue.put(None)
 
-        # 并发回填所有群组，级别从 O(N) 串行降为 O(1) 并发
-        results = await asyncio.gather(*[_recover_one(gid) for gid in self._monitored_ids])
+        # 并发回填所有群组（并发度受 sem 限制）
+        results, _ = await asyncio.gather(_produce_all(), _writer())
         total_recovered = sum(results)
 
         if total_recovered > 0:
@@ -247,12 +304,20 @@ class Collector:
         self._running = True
         chats = list(self._monitored_ids) if self._monitored_ids else None
 
+        # 运行期间不变的对象提前绑定为闭包变量，每条消息少几次属性查找
+        # （config 中的 alerts.enabled 只在启动时读取一次）
+        msg_queue = self._msg_queue
+        group_names = self._group_names
+        alert_manager = self.alert_manager
+        alert_enabled = alert_manager.enabled
+
         @self.client.on(events.NewMessage(chats=chats))
         async def on_new_message(event):
             try:
-                msg_dict = await self._message_to_dict(event.message)
+                # 事件自带已缓存的 chat 实体时直接复用（为 None 时内部回退到 get_chat）
+                msg_dict = await self._message_to_dict(event.message, chat=event.chat)
                 if msg_dict:
-                    self._msg_queue.put_nowait(msg_dict)
+                    msg_queue.put_nowait(msg_dict)
                     # 更新最后消息时间（用于缺口恢复）
                     msg_date = event.message.date
                     if msg_date:
@@ -260,17 +325,20 @@ class Collector:
                             tzinfo=timezone.utc
                         )
                     # 关键词告警检查（enabled=false 时完全跳过，不产生任何函数调用开销）
-                    if self.alert_manager.enabled:
-                        group_name = self._group_names.get(
+                    if alert_enabled:
+                        group_name = group_names.get(
                             msg_dict.get("group_id", 0), "未知群组"
                         )
-                        await self.alert_manager.check_message(
+                        await alert_manager.check_message(
                             msg_dict, group_name=group_name
                         )
-                    logger.debug(
-                        f"[{msg_dict.get('sender_name', '?')}] "
-                        f"{(msg_dict.get('text') or '')[:60]}"
-                    )
+                    # 生产环境默认不开 DEBUG，先判断再格式化，避免每条消息白做一次切片和拼接
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(
+                            "[%s] %s",
+                            msg_dict.get("sender_name", "?"),
+                            (msg_dict.get("text") or "")[:60],
+                        )
             except Exception as e:
                 logger.error(f"处理消息失败: {e}", exc_info=True)
 
@@ -279,9 +347,17 @@ class Collector:
             """消息被编辑时，同步更新数据库文本内容（FTS 由触发器自动维护）"""
             try:
                 msg = event.message
-                chat = await event.get_chat()
-                group_id = getattr(chat, "id", None)
-                if group_id is None or group_id not in self._monitored_ids:
+                # 直接从 peer 取未加标记的群 ID（与 entity.id 一致），无需 await get_chat()；
+                # event.chat_id 带 -100 前缀，不能直接用来匹配库中的 group_id
+                peer = msg.peer_id
+                if isinstance(peer, PeerChannel):
+                    group_id = peer.channel_id
+                elif isinstance(peer, PeerChat):
+                    group_id = peer.chat_id
+                else:
+                    return
+                # chats 为 None（未配置群组）时 Telethon 不做过滤，集合判断仍保留兜底
+                if group_id not in self._monitored_ids:
                     return
 
                 new_text = msg.text or msg.message or None
@@ -324,12 +400,13 @@ class Collector:
                         group_name = self._group_names.get(channel_id, str(channel_id))
                         logger.info(f"🗑️ [{group_name}] 已同步删除 {deleted} 条消息")
                 else:
-                    # 普通群删除事件：遍历所有监控群组尝试删除
-                    for gid in self._monitored_ids:
-                        deleted = await self.db.delete_messages(msg_ids, group_id=gid)
-                        if deleted:
-                            group_name = self._group_names.get(gid, str(gid))
-                            logger.info(f"🗑️ [{group_name}] 已同步删除 {deleted} 条消息")
+                    # 普通群删除事件：一条语句覆盖所有监控群组
+                    counts = await self.db.delete_messages_multi(
+                        msg_ids, list(self._monitored_ids)
+                    )
+                    for gid, deleted in counts.items():
+                        group_name = self._group_names.get(gid, str(gid))
+                        logger.info(f"🗑️ [{group_name}] 已同步删除 {deleted} 条消息")
             except Exception as e:
                 logger.error(f"处理删除事件失败: {e}", exc_info=True)
 
@@ -361,7 +438,8 @@ class Collector:
                 
                 if batch:
                     try:
-                        await self.db.insert_messages_batch(batch)
+                        async with self._write_lock:
+                            await self.db.insert_messages_batch(batch)
                         for _ in batch:
                             self._msg_queue.task_done()
                     except Exception as e:
@@ -477,8 +555,10 @@ class Collector:
                 title = getattr(entity, "title", str(gid))
                 logger.info(f"⏳ 拉取 [{title}] 历史消息 (limit={limit})...")
 
-                # C2 修复：先收集再批量 insert，避免逐条 commit 严重拖慢历史拉取
+                # C2 修复：分块批量 insert，避免逐条 commit 严重拖慢历史拉取
                 batch: list = []
+                fetched = 0
+                senders: Dict[Any, Any] = {}
                 async for message in self.client.iter_messages(
                     entity,
                     limit=limit,
@@ -488,23 +568,43 @@ class Collector:
                     if since and message.date.replace(tzinfo=timezone.utc) < since:
                         break  # iter_messages 倒序遍历，遇到比 since 更早的消息即可停止
 
-                    msg_dict = await self._message_to_dict(message)
+                    msg_dict = await self._message_to_dict(
+                        message, chat=entity, sender_cache=senders,
+                    )
                     if msg_dict:
                         msg_dict["group_id"] = gid
                         batch.append(msg_dict)
+                        # 边拉边写：攒够一块就落库，峰值内存为 O(INSERT_CHUNK) 而非 O(limit)
+                        if len(batch) >= INSERT_CHUNK:
+                            async with self._write_lock:
+                                await self.db.insert_messages_batch(batch)
+                            fetched += len(batch)
+                            batch = []
 
                 if batch:
-                    await self.db.insert_messages_batch(batch)
-                logger.info(f"✅ [{title}] 拉取了 {len(batch)} 条消息")
-                total += len(batch)
+                    async with self._write_lock:
+                        await self.db.insert_messages_batch(batch)
+                    fetched += len(batch)
+                logger.info(f"✅ [{title}] 拉取了 {fetched} 条消息")
+                total += fetched
 
             except Exception as e:
                 logger.error(f"❌ 拉取群组 {gid} 历史失败: {e}", exc_info=True)
 
         return total
 
-    async def _message_to_dict(self, message) -> Optional[dict]:
-        """将 Telethon Message 转为字典"""
+    async def _message_to_dict(
+        self,
+        message,
+        *,
+        chat=None,
+        sender_cache: Optional[Dict[Any, Any]] = None,
+    ) -> Optional[dict]:
+        """
+        将 Telethon Message 转为字典。
+        批量拉取时调用方传入已解析的 chat 实体和本轮共用的 sender_cache，
+        同一群里反复出现的发送者只解析一次，也不再逐条 get_chat()。
+        """
         if message is None:
             return None
 
@@ -512,8 +612,16 @@ class Collector:
         if message.action is not None:
             return None
 
-        sender = await message.get_sender()
-        chat = await message.get_chat()
+        if sender_cache is None:
+            sender = await message.get_sender()
+        else:
+            sender_id = message.sender_id
+            sender = sender_cache.get(sender_id)
+            if sender is None:
+                sender = await message.get_sender()
+                sender_cache[sender_id] = sender
+        if chat is None:
+            chat = await message.get_chat()
 
         # 获取 group_id
         group_id = None
@@ -539,6 +647,7 @@ class Collector:
     async def stop(self):
         """停止采集器"""
         self._running = False
+        await self.alert_manager.close()
         if self.client:
             await self.client.disconnect()
             logger.info("🔌 已断开 Telegram 连接")
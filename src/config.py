@@ -15,6 +15,9 @@ from dotenv import load_dotenv
 # 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent.resolve()
 
+# 默认过滤的 Telegram 内部域名（filtering.block_domains 未配置时使用）
+DEFAULT_BLOCK_DOMAINS = ("t.me", "telegram.me", "telegram.org", "telegra.ph", "telegram.dog")
+
 # 加载 .env
 load_dotenv(PROJECT_ROOT / ".env")
 
@@ -17,7 +17,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from pydantic import BaseModel
 
-from .config import load_config
+from .config import DEFAULT_BLOCK_DOMAINS, load_config
 from .database import Database
 from .rag import RAGEngine
 
@@ -213,10 +213,7 @@ async def api_links(limit: int = Query(default=30), db: Database = Depends(get_d
     config = _config or load_config()
     
     # 动态加载过滤域名，默认过滤内部短链接
-    block_domains = config.get("filtering", {}).get(
-        "block_domains", 
-        ["t.me", "telegram.me", "telegram.org", "telegra.ph", "telegram.dog"]
-    )
+    block_domains = config.get("filtering", {}).get("block_domains", DEFAULT_BLOCK_DOMAINS)
     
     links = await db.get_links_aggregated(limit=limit, block_domains=block_domains)
     return {"data": links}
@@ -254,7 +251,7 @@ async def api_alerts_config(db: Database = Depends(get_db)):
 @app.post("/api/alerts/toggle")
 async def api_alerts_toggle(body: dict = Body(default={}), db: Database = Depends(get_db)):
     """
-    运行时开关关键词告警（持久化至数据库，Collector 下次 check 生效）
+    运行时开关关键词告警（持久化至数据库，Collector 缓存过期后（约 5 秒）生效）
     Body: {"enabled": true/false}
     """
     enabled = body.get("enabled")
@@ -2,7 +2,7 @@
 数据库门面模式模块 (Facade)
 保持 API 兼容性，将逻辑路由到 src/db/ 内部的具体 DAO。
 """
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, Iterable
 
 from .db.core import DatabaseConnection
 from .db.messages import MessagesDAO
@@ -31,14 +31,19 @@ class Database:
         await self._core.connect()
         # 初始化所有 DAO 依赖
         conn = self._core.conn
-        self.messages = MessagesDAO(conn)
+        acquire = self._core.acquire
+        self.messages = MessagesDAO(conn, acquire)
         self.links = LinksDAO(conn)
-        self.analytics = AnalyticsDAO(conn)
+        self.analytics = AnalyticsDAO(conn, acquire)
         self.groups = GroupsDAO(conn)
         self.alerts = AlertsDAO(conn)
         self.tenants = TenantsDAO(conn)
         self.settings_dao = SettingsDAO(conn)
 
+    async def init_pool(self, size: int = 4):
+        """打开只读连接池，使并发的统计/搜索查询不再排队在同一条连接上"""
+        await self._core.init_pool(size)
+
     async def close(self):
         await self._core.close()
 
@@ -85,8 +90,11 @@ class Database:
     async def get_message_count(self, group_id: Optional[int] = None, since: Optional[str] = None, until: Optional[str] = None) -> int:
         return await self.messages.get_message_count(group_id, since, until)
 
-    async def search_messages(self, keyword: str, limit: int = 50) -> List[dict]:
-        return await self.messages.search_messages(keyword, limit)
+    async def search_messages(self, keyword: str, limit: int = 50, offset: int = 0) -> List[dict]:
+        return await self.messages.search_messages(keyword, limit, offset)
+
+    async def count_search_messages(self, keyword: str) -> int:
+        return await self.messages.count_search_messages(keyword)
 
     async def update_message_text(self, msg_id: int, group_id: int, new_text: Optional[str], media_type: Optional[str] = None) -> bool:
         return await self.messages.update_message_text(msg_id, group_id, new_text, media_type)
@@ -94,6 +102,9 @@ class Database:
     async def delete_messages(self, msg_ids: List[int], group_id: int) -> int:
         return await self.messages.delete_messages(msg_ids, group_id)
 
+    async def delete_messages_multi(self, msg_ids: List[int], group_ids: List[int]) -> Dict[int, int]:
+        return await self.messages.delete_messages_multi(msg_ids, group_ids)
+
     async def cleanup_old_messages(self, keep_days: int = 90) -> int:
         return await self.messages.cleanup_old_messages(keep_days)
 
@@ -107,16 +118,19 @@ class Database:
         return await self.messages.get_message_trends(hours)
 
     # ─── 链接操作 (LinksDAO) ───
-    async def get_links(self, group_id: Optional[int] = None, limit: int = 20, block_domains: Optional[List[str]] = None) -> List[dict]:
+    async def get_links(self, group_id: Optional[int] = None, limit: int = 20, block_domains: Optional[Iterable[str]] = None) -> List[dict]:
         return await self.links.get_links(group_id, limit, block_domains)
 
-    async def get_links_aggregated(self, limit: int = 50, block_domains: Optional[List[str]] = None) -> List[dict]:
+    async def get_links_aggregated(self, limit: int = 50, block_domains: Optional[Iterable[str]] = None) -> List[dict]:
         return await self.links.get_links_aggregated(limit, block_domains)
 
     # ─── 告警去重持久化 (AlertsDAO) ───
     async def add_alerted_message(self, msg_key: str):
         return await self.alerts.add_alerted_message(msg_key)
 
+    async def add_alerted_messages_batch(self, msg_keys: List[str]):
+        return await self.alerts.add_alerted_messages_batch(msg_keys)
+
     async def get_recent_alerted_ids(self, hours: int = 24) -> set:
         return await self.alerts.get_recent_alerted_ids(hours)
 
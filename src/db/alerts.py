@@ -1,22 +1,32 @@
 import logging
+from typing import List
 from datetime import datetime, timezone, timedelta
 
 logger = logging.getLogger("tg-monitor.db.alerts")
 
+# 单条与批量写入共用的 SQL；语句复用靠连接上的 cached_statements，与是否提成常量无关
+INSERT_ALERTED_SQL = "INSERT OR IGNORE INTO alerted_messages (msg_key) VALUES (?)"
+
 class AlertsDAO:
     def __init__(self, conn):
         self.conn = conn
 
     async def add_alerted_message(self, msg_key: str):
         try:
-            await self.conn.execute(
-                "INSERT OR IGNORE INTO alerted_messages (msg_key) VALUES (?)",
-                (msg_key,),
-            )
+            await self.conn.execute(INSERT_ALERTED_SQL, (msg_key,))
             await self.conn.commit()
         except Exception as e:
             logger.warning(f"⚠️ 写入告警记录失败: {e}")
 
+    async def add_alerted_messages_batch(self, msg_keys: List[str]):
+        if not msg_keys:
+            return
+        try:
+            await self.conn.executemany(INSERT_ALERTED_SQL, [(k,) for k in msg_keys])
+            await self.conn.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ 批量写入告警记录失败 ({len(msg_keys)} 条): {e}")
+
     async def get_recent_alerted_ids(self, hours: int = 24) -> set:
         try:
             since = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat(timespec='seconds')
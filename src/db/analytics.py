@@ -2,8 +2,10 @@ from typing import Optional, List, Any
 from datetime import datetime, timezone, timedelta
 
 class AnalyticsDAO:
-    def __init__(self, conn):
+    def __init__(self, conn, acquire):
         self.conn = conn
+        # 只读查询通过 acquire() 从只读连接池借连接，写入仍走主连接
+        self._acquire = acquire
 
     async def save_summary(
         self,
@@ -47,23 +49,24 @@ class AnalyticsDAO:
             params.append(until)
 
         where = "WHERE " + " AND ".join(conditions) if conditions else ""
-        cursor = await self.conn.execute(
-            f"""SELECT
-                  g.title,
-                  m.group_id,
-                  COUNT(*) as message_count,
-                  COUNT(DISTINCT COALESCE(CAST(m.sender_id AS TEXT), m.sender_name)) as active_users,
-                  MIN(m.date) as first_msg,
-                  MAX(m.date) as last_msg
-                FROM messages m
-                LEFT JOIN groups g ON m.group_id = g.id
-                {where}
-                GROUP BY m.group_id
-                ORDER BY message_count DESC""",
-            params,
-        )
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        async with self._acquire() as conn:
+            cursor = await conn.execute(
+                f"""SELECT
+                      g.title,
+                      m.group_id,
+                      COUNT(*) as message_count,
+                      COUNT(DISTINCT COALESCE(CAST(m.sender_id AS TEXT), m.sender_name)) as active_users,
+                      MIN(m.date) as first_msg,
+                      MAX(m.date) as last_msg
+                    FROM messages m
+                    LEFT JOIN groups g ON m.group_id = g.id
+                    {where}
+                    GROUP BY m.group_id
+                    ORDER BY message_count DESC""",
+                params,
+            )
+            rows = await cursor.fetchall()
+            return [dict(r) for r in rows]
 
     async def get_top_senders(
         self,
@@ -81,16 +84,17 @@ class AnalyticsDAO:
             params.append(since)
 
         where = "WHERE " + " AND ".join(conditions) if conditions else ""
-        cursor = await self.conn.execute(
-            f"""SELECT sender_name, sender_id, COUNT(*) as msg_count
-                FROM messages
-                {where}
-                GROUP BY sender_id
-                ORDER BY msg_count DESC LIMIT ?""",
-            [*params, limit],
-        )
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        async with self._acquire() as conn:
+            cursor = await conn.execute(
+                f"""SELECT COALESCE(sender_name, '?') as sender_name, sender_id, COUNT(*) as msg_count
+                    FROM messages
+                    {where}
+                    GROUP BY sender_id
+                    ORDER BY msg_count DESC LIMIT ?""",
+                [*params, limit],
+            )
+            rows = await cursor.fetchall()
+            return [dict(r) for r in rows]
 
     async def get_date_range(
         self,
@@ -107,15 +111,16 @@ class AnalyticsDAO:
             params.append(until)
 
         where = "WHERE " + " AND ".join(conditions) if conditions else ""
-        cursor = await self.conn.execute(
-            f"""SELECT MIN(date) as first_msg,
-                       MAX(date) as last_msg,
-                       COUNT(*) as total
-                FROM messages {where}""",
-            params,
-        )
-        row = await cursor.fetchone()
-        return dict(row)
+        async with self._acquire() as conn:
+            cursor = await conn.execute(
+                f"""SELECT MIN(date) as first_msg,
+                           MAX(date) as last_msg,
+                           COUNT(*) as total
+                    FROM messages {where}""",
+                params,
+            )
+            row = await cursor.fetchone()
+            return dict(row)
 
     async def get_heatmap_data(
         self, days: int = 30,
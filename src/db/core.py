@@ -2,11 +2,13 @@
 核心数据库连接与结构模块
 负责 SQLite 连接、PRAGMA 配置、Schema 初始化及迁移
 """
+import asyncio
 import aiosqlite
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import AsyncIterator, Optional, List, Tuple
 
 logger = logging.getLogger("tg-monitor.db.core")
 
@@ -201,22 +203,64 @@ MIGRATIONS: List[Tuple[int, str, str]] = [
     )
 ]
 
+# 只读连接的 PRAGMA（WAL 模式下读连接不阻塞写连接，也互不阻塞）
+READER_PRAGMAS = (
+    "PRAGMA busy_timeout=60000",
+    "PRAGMA query_only = ON",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+)
+
+
 class DatabaseConnection:
     """处理数据库底层连接、初始化及迁移"""
 
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.conn: Optional[aiosqlite.Connection] = None
+        # 只读连接池（init_pool 之后才存在）；每个 aiosqlite 连接独占一个工作线程
+        self._pool: Optional[asyncio.Queue] = None
+        self._pool_conns: List[aiosqlite.Connection] = []
+
+    async def init_pool(self, size: int = 4):
+        """打开 size 个只读连接，供并发的只读查询使用"""
+        if self._pool is not None or size <= 0:
+            return
+        pool: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            conn = await aiosqlite.connect(self.db_path, cached_statements=256)
+            conn.row_factory = aiosqlite.Row
+            for pragma in READER_PRAGMAS:
+                await conn.execute(pragma)
+            self._pool_conns.append(conn)
+            pool.put_nowait(conn)
+        self._pool = pool
+        logger.info(f"✅ 只读连接池已就绪 ({size} 个连接)")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        """借出一个只读连接；未初始化连接池时退回主连接"""
+        if self._pool is None:
+            yield self.conn
+            return
+        conn = await self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put_nowait(conn)
 
     async def connect(self):
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        self.conn = await aiosqlite.connect(self.db_path)
+        # 长连接 + 较大的语句缓存：高频 SQL 只解析/编译一次
+        self.conn = await aiosqlite.connect(self.db_path, cached_statements=256)
         self.conn.row_factory = aiosqlite.Row
         
         await self.conn.execute("PRAGMA busy_timeout=60000")
         await self.conn.execute("PRAGMA journal_mode=WAL")
         await self.conn.execute("PRAGMA cache_size = -32000")
         await self.conn.execute("PRAGMA temp_store = MEMORY")
+        await self.conn.execute("PRAGMA mmap_size = 268435456")
         await self.conn.execute("PRAGMA synchronous = NORMAL")
         await self.conn.execute("PRAGMA wal_autocheckpoint = 1000")
         
@@ -253,12 +297,15 @@ class DatabaseConnection:
             await self.conn.execute(FTS_TRIGGER_DELETE_SQL)
             await self.conn.commit()
             
-            cursor = await self.conn.execute("SELECT COUNT(*) as cnt FROM messages_fts")
-            fts_count = (await cursor.fetchone())["cnt"]
-            cursor2 = await self.conn.execute("SELECT COUNT(*) as cnt FROM messages WHERE text IS NOT NULL")
-            msg_count = (await cursor2.fetchone())["cnt"]
-            if fts_count == 0 and msg_count > 0:
-                logger.info(f"🔄 重建 FTS 索引 ({msg_count} 条消息)...")
+            # 每次启动都会执行：只做存在性探测，避免对全表 COUNT(*)。
+            # 外部内容表上 SELECT messages_fts 实际读的是 messages，
+            # 索引是否为空要看影子表 messages_fts_docsize
+            cursor = await self.conn.execute("SELECT 1 FROM messages_fts_docsize LIMIT 1")
+            fts_empty = await cursor.fetchone() is None
+            cursor2 = await self.conn.execute("SELECT 1 FROM messages WHERE text IS NOT NULL LIMIT 1")
+            has_text = await cursor2.fetchone() is not None
+            if fts_empty and has_text:
+                logger.info("🔄 重建 FTS 索引...")
                 await self.conn.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild')")
                 await self.conn.commit()
                 logger.info("✅ FTS 索引重建完成")
@@ -300,5 +347,9 @@ class DatabaseConnection:
                     raise
 
     async def close(self):
+        for conn in self._pool_conns:
+            await conn.close()
+        self._pool_conns.clear()
+        self._pool = None
         if self.conn:
             await self.conn.close()
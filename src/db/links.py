@@ -1,4 +1,16 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Iterable, Tuple
+
+
+def _block_domain_conditions(block_domains: Optional[Iterable[str]]) -> Tuple[List[str], List[Any]]:
+    """
+    将屏蔽域名转为 NOT LIKE 条件（按小写去重并保持顺序）。
+    SQLite 的 LIKE 本身对 ASCII 大小写不敏感，无需再对每行 url 调用 LOWER()。
+    """
+    if not block_domains:
+        return [], []
+    patterns = list(dict.fromkeys(f"%{d.lower()}%" for d in block_domains))
+    return ["l.url NOT LIKE ?"] * len(patterns), patterns
+
 
 class LinksDAO:
     def __init__(self, conn):
@@ -8,16 +20,10 @@ class LinksDAO:
         self,
         group_id: Optional[int] = None,
         limit: int = 20,
-        block_domains: Optional[List[str]] = None,
+        block_domains: Optional[Iterable[str]] = None,
     ) -> List[dict]:
-        conditions: List[str] = []
-        params: List[Any] = []
-        
-        if block_domains:
-            for domain in block_domains:
-                conditions.append("LOWER(l.url) NOT LIKE ?")
-                params.append(f"%{domain.lower()}%")
-                
+        conditions, params = _block_domain_conditions(block_domains)
+
         if group_id is not None:
             conditions.append("l.group_id = ?")
             params.append(group_id)
@@ -37,24 +43,17 @@ class LinksDAO:
     async def get_links_aggregated(
         self,
         limit: int = 50,
-        block_domains: Optional[List[str]] = None,
+        block_domains: Optional[Iterable[str]] = None,
     ) -> List[dict]:
-        conditions: List[str] = ["1=1"]
-        params: List[Any] = []
-        
-        if block_domains:
-            for domain in block_domains:
-                conditions.append("LOWER(l.url) NOT LIKE ?")
-                params.append(f"%{domain.lower()}%")
-
-        where = " AND ".join(conditions)
+        conditions, params = _block_domain_conditions(block_domains)
+        where = " AND ".join(["1=1", *conditions])
         cursor = await self.conn.execute(
             f"""SELECT
                   l.url,
                   COUNT(*) as total_count,
                   COUNT(DISTINCT l.group_id) as group_count,
-                  GROUP_CONCAT(DISTINCT g.title) as group_titles,
-                  GROUP_CONCAT(DISTINCT l.sender_name) as sender_names,
+                  COALESCE(GROUP_CONCAT(DISTINCT g.title), '?') as group_titles,
+                  COALESCE(GROUP_CONCAT(DISTINCT l.sender_name), '?') as sender_names,
                   MIN(l.discovered_at) as first_seen,
                   MAX(l.discovered_at) as last_seen,
                   MAX(l.title) as title,
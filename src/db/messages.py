@@ -1,6 +1,6 @@
 import asyncio
 import re
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, Tuple
 import logging
 from datetime import datetime, timezone, timedelta
 from bs4 import BeautifulSoup
@@ -12,9 +12,74 @@ URL_PATTERN = re.compile(
     r"https?://[^\s<>\"')\]，。！？、；：）》」』】\u200b]+"
 )
 
+def _fts_phrase(token: str) -> str:
+    """把单个词元包成 FTS5 字符串（内部双引号转义）"""
+    return '"' + token.replace('"', '""') + '"'
+
+
+def _fts_queries(keyword: str) -> Tuple[str, ...]:
+    """
+    依次尝试的 MATCH 表达式：先按原样（保留 `foo bar` 的隐式 AND、`foo*`、OR、NEAR 等语法），
+    报语法错误时再逐词加引号。含 `.` `-` `:` 的关键词（如链接、C++）原样会报错，
+    逐词加引号后仍走倒排索引，而不是退化为全表 LIKE 扫描。
+    """
+    quoted = " ".join(_fts_phrase(t) for t in keyword.split())
+    return (keyword,) if quoted == keyword else (keyword, quoted)
+
+
+# unicode61 分词器把连续的中日韩文字整段当作一个词元，
+# 子串（如在「今天讨论比特币价格」里搜「比特币」）MATCH 不到且不会报错。
+# 紧贴中文的拉丁词同样如此：「今天BTC涨了」整段是一个词元，搜「BTC」命中不了这条
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+
+def _use_fts(keyword: str) -> bool:
+    """
+    关键词能否交给 FTS5 倒排索引；含 CJK 字符时走 LIKE 才能命中子串。
+
+    纯拉丁关键词走 FTS 时，嵌在中文里的出现（「今天BTC涨了」中的 BTC）不会被命中；
+    FTS 一条都没命中时 search / count 会再用 LIKE 兜底，但只要有别的消息命中，
+    这类嵌入中文的出现就会被漏掉。彻底解决需要换 trigram 分词器并重建索引。
+    """
+    return _CJK_RE.search(keyword) is None
+
+
+_MSG_INSERT_SQL = """INSERT OR IGNORE INTO messages
+   (id, group_id, sender_id, sender_name, text, date,
+    media_type, forward_from, reply_to_id, raw_json)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_LINK_INSERT_SQL = """INSERT OR IGNORE INTO links (url, message_id, group_id,
+                     sender_name, context, discovered_at)
+   VALUES (?, ?, ?, ?, ?, ?)"""
+
+
+def _msg_row(msg: dict) -> tuple:
+    return (
+        msg["id"], msg["group_id"], msg.get("sender_id"),
+        msg.get("sender_name"), msg.get("text"), msg["date"],
+        msg.get("media_type"), msg.get("forward_from"),
+        msg.get("reply_to_id"), msg.get("raw_json"),
+    )
+
+
+def _link_rows(msg: dict) -> List[tuple]:
+    """消息正文中提取出的链接行（与 _LINK_INSERT_SQL 的列顺序一致）"""
+    text = msg.get("text")
+    if not text:
+        return []
+    context = text[:200]
+    return [
+        (url, msg["id"], msg["group_id"], msg.get("sender_name"), context, msg["date"])
+        for url in URL_PATTERN.findall(text)
+    ]
+
+
 class MessagesDAO:
-    def __init__(self, conn):
+    def __init__(self, conn, acquire):
         self.conn = conn
+        # 只读查询通过 acquire() 从只读连接池借连接，写入仍走主连接
+        self._acquire = acquire
         self.link_queue = asyncio.Queue()
         self._link_worker_task = asyncio.create_task(self._link_parser_worker())
 
@@ -85,34 +150,13 @@ class MessagesDAO:
 
     async def insert_message(self, msg: dict):
         try:
-            await self.conn.execute(
-                """INSERT OR IGNORE INTO messages
-                   (id, group_id, sender_id, sender_name, text, date,
-                    media_type, forward_from, reply_to_id, raw_json)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    msg["id"], msg["group_id"], msg.get("sender_id"),
-                    msg.get("sender_name"), msg.get("text"), msg["date"],
-                    msg.get("media_type"), msg.get("forward_from"),
-                    msg.get("reply_to_id"), msg.get("raw_json"),
-                ),
-            )
-            if msg.get("text"):
-                urls = URL_PATTERN.findall(msg["text"])
-                for url in urls:
-                    await self.conn.execute(
-                        """INSERT OR IGNORE INTO links (url, message_id, group_id, sender_name,
-                                             context, discovered_at)
-                           VALUES (?, ?, ?, ?, ?, ?)""",
-                        (
-                            url, msg["id"], msg["group_id"],
-                            msg.get("sender_name"),
-                            msg["text"][:200],
-                            msg["date"],
-                        ),
-                    )
-                    self.link_queue.put_nowait((url, msg["id"], msg["group_id"]))
+            await self.conn.execute(_MSG_INSERT_SQL, _msg_row(msg))
+            links = _link_rows(msg)
+            if links:
+                await self.conn.executemany(_LINK_INSERT_SQL, links)
             await self.conn.commit()
+            for url, message_id, group_id, *_ in links:
+                self.link_queue.put_nowait((url, message_id, group_id))
         except Exception as e:
             logger.error(
                 f"❌ 插入消息失败 (msg_id={msg.get('id')}, "
@@ -123,35 +167,15 @@ class MessagesDAO:
         if not messages:
             return
         try:
-            for msg in messages:
-                await self.conn.execute(
-                    """INSERT OR IGNORE INTO messages
-                       (id, group_id, sender_id, sender_name, text, date,
-                        media_type, forward_from, reply_to_id, raw_json)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        msg["id"], msg["group_id"], msg.get("sender_id"),
-                        msg.get("sender_name"), msg.get("text"), msg["date"],
-                        msg.get("media_type"), msg.get("forward_from"),
-                        msg.get("reply_to_id"), msg.get("raw_json"),
-                    ),
-                )
-                if msg.get("text"):
-                    urls = URL_PATTERN.findall(msg["text"])
-                    for url in urls:
-                        await self.conn.execute(
-                            """INSERT OR IGNORE INTO links (url, message_id, group_id,
-                                                 sender_name, context, discovered_at)
-                               VALUES (?, ?, ?, ?, ?, ?)""",
-                            (
-                                url, msg["id"], msg["group_id"],
-                                msg.get("sender_name"),
-                                msg["text"][:200],
-                                msg["date"],
-                            ),
-                        )
-                        self.link_queue.put_nowait((url, msg["id"], msg["group_id"]))
+            # aiosqlite 的每次 execute 都要在事件循环与后台线程之间往返一次；
+            # executemany 让整批行在后台线程内一次性写完
+            links = [row for msg in messages for row in _link_rows(msg)]
+            await self.conn.executemany(_MSG_INSERT_SQL, [_msg_row(m) for m in messages])
+            if links:
+                await self.conn.executemany(_LINK_INSERT_SQL, links)
             await self.conn.commit()
+            for url, message_id, group_id, *_ in links:
+                self.link_queue.put_nowait((url, message_id, group_id))
             logger.info(f"✅ 批量插入 {len(messages)} 条消息")
         except Exception as e:
             logger.error(f"❌ 批量插入失败: {e}")
@@ -180,9 +204,10 @@ class MessagesDAO:
         limit_clause = f"LIMIT {limit}" if limit else ""
         query = f"SELECT * FROM messages {where} ORDER BY date ASC {limit_clause}"
 
-        cursor = await self.conn.execute(query, params)
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        async with self._acquire() as conn:
+            cursor = await conn.execute(query, params)
+            rows = await cursor.fetchall()
+            return [dict(r) for r in rows]
 
     async def get_message_count(
         self,
@@ -203,37 +228,76 @@ class MessagesDAO:
             params.append(until)
 
         where = "WHERE " + " AND ".join(conditions) if conditions else ""
-        cursor = await self.conn.execute(
-            f"SELECT COUNT(*) as cnt FROM messages {where}", params
+        async with self._acquire() as conn:
+            cursor = await conn.execute(
+                f"SELECT COUNT(*) as cnt FROM messages {where}", params
+            )
+            row = await cursor.fetchone()
+            return row["cnt"]
+
+    @staticmethod
+    async def _fts_count(conn, query: str) -> int:
+        cursor = await conn.execute(
+            """SELECT COUNT(*) as cnt
+               FROM messages m
+               JOIN messages_fts fts ON m.rowid = fts.rowid
+               WHERE messages_fts MATCH ?""",
+            (query,),
         )
-        row = await cursor.fetchone()
-        return row["cnt"]
+        return (await cursor.fetchone())["cnt"]
 
-    async def search_messages(self, keyword: str, limit: int = 50) -> List[dict]:
-        try:
-            cursor = await self.conn.execute(
-                """SELECT m.*, g.title as group_title
-                   FROM messages m
-                   JOIN messages_fts fts ON m.rowid = fts.rowid
-                   LEFT JOIN groups g ON m.group_id = g.id
-                   WHERE messages_fts MATCH ?
-                   ORDER BY m.date DESC LIMIT ?""",
-                (keyword, limit),
-            )
-            rows = await cursor.fetchall()
-            return [dict(r) for r in rows]
-        except Exception:
-            cursor = await self.conn.execute(
+    async def search_messages(self, keyword: str, limit: int = 50, offset: int = 0) -> List[dict]:
+        async with self._acquire() as conn:
+            for query in _fts_queries(keyword) if _use_fts(keyword) else ():
+                try:
+                    cursor = await conn.execute(
+                        """SELECT m.*, g.title as group_title
+                           FROM messages m
+                           JOIN messages_fts fts ON m.rowid = fts.rowid
+                           LEFT JOIN groups g ON m.group_id = g.id
+                           WHERE messages_fts MATCH ?
+                           ORDER BY m.date DESC LIMIT ? OFFSET ?""",
+                        (query, limit, offset),
+                    )
+                    rows = await cursor.fetchall()
+                except Exception:
+                    continue
+                if rows:
+                    return [dict(r) for r in rows]
+                # 翻页越界时本页为空，但 FTS 有命中就不能改用 LIKE，否则与计数对不上
+                if offset and await self._fts_count(conn, query):
+                    return []
+                # FTS 零命中：关键词可能只出现在中文里，交给 LIKE 兜底
+                break
+            cursor = await conn.execute(
                 """SELECT m.*, g.title as group_title
                    FROM messages m
                    LEFT JOIN groups g ON m.group_id = g.id
                    WHERE m.text LIKE ?
-                   ORDER BY m.date DESC LIMIT ?""",
-                (f"%{keyword}%", limit),
+                   ORDER BY m.date DESC LIMIT ? OFFSET ?""",
+                (f"%{keyword}%", limit, offset),
             )
             rows = await cursor.fetchall()
             return [dict(r) for r in rows]
 
+    async def count_search_messages(self, keyword: str) -> int:
+        async with self._acquire() as conn:
+            for query in _fts_queries(keyword) if _use_fts(keyword) else ():
+                try:
+                    cnt = await self._fts_count(conn, query)
+                except Exception:
+                    continue
+                if cnt:
+                    return cnt
+                # 与 search_messages 一致：FTS 零命中时用 LIKE 兜底
+                break
+            cursor = await conn.execute(
+                "SELECT COUNT(*) as cnt FROM messages WHERE text LIKE ?",
+                (f"%{keyword}%",),
+            )
+            row = await cursor.fetchone()
+            return row["cnt"]
+
     async def update_message_text(
         self,
         msg_id: int,
@@ -299,6 +363,35 @@ class MessagesDAO:
             logger.error(f"❌ 删除消息失败 (group={group_id}): {e}")
             return 0
 
+    async def delete_messages_multi(
+        self,
+        msg_ids: List[int],
+        group_ids: List[int],
+    ) -> Dict[int, int]:
+        """
+        删除事件不带群组信息时，一条语句在所有候选群里删除，返回 {group_id: 删除条数}。
+        FTS 索引由 messages_ad 触发器同步。
+        """
+        if not msg_ids or not group_ids:
+            return {}
+        id_ph = ",".join("?" * len(msg_ids))
+        group_ph = ",".join("?" * len(group_ids))
+        where = f"id IN ({id_ph}) AND group_id IN ({group_ph})"
+        params = [*msg_ids, *group_ids]
+        try:
+            cursor = await self.conn.execute(
+                f"SELECT group_id, COUNT(*) as cnt FROM messages WHERE {where} GROUP BY group_id",
+                params,
+            )
+            counts = {row["group_id"]: row["cnt"] for row in await cursor.fetchall()}
+            if counts:
+                await self.conn.execute(f"DELETE FROM messages WHERE {where}", params)
+                await self.conn.commit()
+            return counts
+        except Exception as e:
+            logger.error(f"❌ 批量删除消息失败: {e}")
+            return {}
+
     async def cleanup_old_messages(
         self,
         keep_days: int = 90,
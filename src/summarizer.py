@@ -78,6 +78,7 @@ class Summarizer:
         hours: Optional[float] = None,
         save: bool = True,
         progress_cb: Optional[Any] = None,
+        result_cb: Optional[Any] = None,
     ) -> str:
         """
         生成指定范围的群聊摘要
@@ -89,6 +90,8 @@ class Summarizer:
             hours: 最近 N 小时（与 since 二选一）
             save: 是否保存到数据库
             progress_cb: 进度回调函数 async def (text, current_step, total_steps)
+            result_cb: 结果回调 async def (summary)，摘要清洗完成后立即调用，
+                       与数据库保存并发执行（调用方可借此提前开始推送）
         """
         # 计算时间范围
         now = datetime.now(timezone.utc)
@@ -102,16 +105,15 @@ class Summarizer:
         if progress_cb:
             await progress_cb("🔍 正在从数据库提取消息...", 1, 10)
 
-        # 获取消息（时间范围内全部，不限条数）
-        messages = await self.db.get_messages(
-            group_id=group_id, since=since, until=until
+        # 获取消息（时间范围内全部，不限条数）与群组信息，两条只读查询并发发出
+        messages, groups = await asyncio.gather(
+            self.db.get_messages(group_id=group_id, since=since, until=until),
+            self.db.get_groups(),
         )
 
         if not messages:
             return "📭 该时间段内没有消息记录。"
 
-        # 获取群组信息
-        groups = await self.db.get_groups()
         group_map = {g["id"]: g["title"] for g in groups}
 
         # 格式化消息为聊天记录文本
@@ -128,6 +130,21 @@ class Summarizer:
         # 清洗 Markdown 格式
         summary = self._clean_markdown(summary)
 
+        if result_cb:
+            # 结果已交给调用方推送，进度消息不再更新；保存与推送并发进行
+            save_job = None
+            if summary and save:
+                save_job = self.db.save_summary(
+                    group_id=group_id,
+                    period_start=since,
+                    period_end=until,
+                    message_count=len(messages),
+                    content=summary,
+                    model=self.model,
+                )
+            await self._deliver_and_save(result_cb(summary), save_job)
+            return summary
+
         if summary and save:
             if progress_cb:
                 await progress_cb("💾 正在保存摘要结果...", 9, 10)
@@ -338,6 +355,23 @@ class Summarizer:
         logger.error(f"❌ LLM 调用多次失败，放弃。最后错误: {last_error}")
         return "❌ LLM 调用失败，请检查网络或配置"
 
+    @staticmethod
+    async def _deliver_and_save(deliver_job, save_job) -> None:
+        """推送与保存并发执行
+
+        保存失败只记日志：结果已经（或正在）送达用户，不能再让调用方当成整体失败；
+        推送失败照常抛出，由调用方走错误提示。
+        """
+        jobs = [j for j in (deliver_job, save_job) if j is not None]
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        for job, res in zip(jobs, results):
+            if not isinstance(res, BaseException):
+                continue
+            if job is save_job:
+                logger.error(f"❌ 摘要保存失败: {res}", exc_info=res)
+            else:
+                raise res
+
     def _clean_markdown(self, text: str) -> str:
         """移除所有 Markdown 符号，使其在纯文本环境下美观可读"""
         import re
@@ -378,8 +412,14 @@ class Summarizer:
         """
         return await self.summarize(hours=hours, save=False)
 
-    async def summarize_per_group(self, hours: float = 24, save: bool = True, progress_cb: Optional[Any] = None) -> str:
-        """按群组分别摘要，再合并为总结报告 (已改为并发执行)"""
+    async def summarize_per_group(
+        self, hours: float = 24, save: bool = True,
+        progress_cb: Optional[Any] = None, result_cb: Optional[Any] = None,
+    ) -> str:
+        """
+        按群组分别摘要，再合并为总结报告 (已改为并发执行)
+        result_cb 含义同 summarize：最终报告就绪后立即回调，与数据库保存并发执行
+        """
         now = datetime.now(timezone.utc)
         since = (now - timedelta(hours=hours)).isoformat(timespec='seconds')
         until = now.isoformat(timespec='seconds')
@@ -500,8 +540,9 @@ class Summarizer:
         # 清洗最终结果
         result = self._clean_markdown(result)
 
+        save_job = None
         if save:
-            await self.db.save_summary(
+            save_job = self.db.save_summary(
                 group_id=None,
                 period_start=since,
                 period_end=until,
@@ -509,8 +550,9 @@ class Summarizer:
                 content=result,
                 model=self.model,
             )
+        await self._deliver_and_save(result_cb(result) if result_cb else None, save_job)
 
-        if progress_cb:
+        if progress_cb and not result_cb:
             await progress_cb("✅ 报告生成完成", 10, 10)
 
         return result
@@ -522,12 +564,11 @@ class Summarizer:
         since = (now - timedelta(hours=24)).isoformat(timespec='seconds')
         stats = await self.db.get_stats(since=since)
 
-        stats_text = "📊 今日数据概览:\n\n"
-        for s in stats:
-            stats_text += (
-                f"  • {s['title']}: {s['message_count']} 条消息, "
-                f"{s['active_users']} 位活跃用户\n"
-            )
+        stats_text = "📊 今日数据概览:\n\n" + "".join(
+            f"  • {s['title']}: {s['message_count']} 条消息, "
+            f"{s['active_users']} 位活跃用户\n"
+            for s in stats
+        )
 
         # 使用按群组分别摘要
         summary = await self.summarize_per_group(hours=24, save=True)
@@ -0,0 +1,81 @@
+import pytest
+
+from src.alerts import ALERT_MAX_LEN, ALERT_SEPARATOR, AlertManager
+
+
+def _manager(statuses=None):
+    """推送结果由 statuses(text, parse_mode) 决定的 AlertManager，记录每次推送"""
+    am = AlertManager({"bot": {"token": "t", "owner_id": 1}})
+    am.sent = []
+
+    async def _post_message(text, parse_mode="Markdown"):
+        am.sent.append((text, parse_mode))
+        return statuses(text, parse_mode) if statuses else 200
+
+    am._post_message = _post_message
+    return am
+
+
+def test_pack_alerts_respects_max_len():
+    items = [f"{i}:" + "x" * (i * 37 % 900) for i in range(60)]
+
+    groups = AlertManager._pack_alerts(items)
+
+    assert [item for g in groups for item in g] == items
+    for g in groups:
+        assert len(ALERT_SEPARATOR.join(g)) <= ALERT_MAX_LEN
+
+
+def test_pack_alerts_fills_groups_greedily():
+    item = "x" * 1000
+    groups = AlertManager._pack_alerts([item] * 7)
+
+    # 每条 1000 字符 + 分隔符：一组最多放 3 条
+    assert [len(g) for g in groups] == [3, 3, 1]
+
+
+def test_pack_alerts_keeps_exact_fit_in_one_group():
+    half = (ALERT_MAX_LEN - len(ALERT_SEPARATOR)) // 2
+    rest = ALERT_MAX_LEN - len(ALERT_SEPARATOR) - half
+
+    groups = AlertManager._pack_alerts(["a" * half, "b" * rest])
+
+    assert len(groups) == 1
+    assert len(ALERT_SEPARATOR.join(groups[0])) == ALERT_MAX_LEN
+
+
+@pytest.mark.asyncio
+async def test_deliver_sends_one_message_per_group():
+    am = _manager()
+    items = ["x" * 1000] * 7
+
+    await am._deliver(items)
+
+    assert len(am.sent) == 3
+    assert all(len(text) <= ALERT_MAX_LEN for text, _ in am.sent)
+    assert all(mode == "Markdown" for _, mode in am.sent)
+
+
+@pytest.mark.asyncio
+async def test_deliver_isolates_bad_markdown():
+    # 含未配对 * 的告警会让 Markdown 解析失败（400）
+    am = _manager(lambda text, mode: 400 if mode and "*bad" in text else 200)
+
+    await am._deliver(["ok one", "*bad", "ok two"])
+
+    assert am.sent == [
+        (ALERT_SEPARATOR.join(["ok one", "*bad", "ok two"]), "Markdown"),
+        ("ok one", "Markdown"),
+        ("*bad", "Markdown"),
+        ("*bad", None),
+        ("ok two", "Markdown"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_deliver_single_rejected_item_goes_straight_to_plain_text():
+    am = _manager(lambda text, mode: 400 if mode else 200)
+
+    await am._deliver(["*bad"])
+
+    assert am.sent == [("*bad", "Markdown"), ("*bad", None)]
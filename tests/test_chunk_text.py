@@ -0,0 +1,80 @@
+import random
+import re
+
+import pytest
+
+from src.bot_handlers.utils import BotUtilsMixin
+
+chunk_text = BotUtilsMixin._chunk_text
+
+_FENCE = re.compile(r"```[^\n`]*")
+_WS = re.compile(r"\s+")
+
+
+def _content(s: str) -> str:
+    """去掉全部围栏标记与空白后的正文（分段只丢弃空白分隔符、只补围栏）"""
+    return _WS.sub("", _FENCE.sub("", s))
+
+
+def _random_text(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(20, 200)):
+        r = rng.random()
+        lang = rng.choice(["", "python", "json"])
+        if r < 0.06:
+            parts.append(f"\n```{lang}\n")
+        elif r < 0.09:
+            # 紧贴在长词后面的围栏：附近没有空白，只能硬切
+            parts.append(f"```{lang}\n")
+        elif r < 0.14:
+            parts.append(f"`{rng.choice(['a', 'bc', 'x y'])}` ")
+        elif r < 0.3:
+            parts.append(rng.choice(["\n", "\n\n", " "]))
+        else:
+            n = rng.choice([3, 8, 15, 120])
+            parts.append("".join(rng.choice("abcxyz") for _ in range(n)))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_chunk_round_trip(seed):
+    rng = random.Random(seed)
+    text = _random_text(rng)
+    limit = rng.choice([40, 64, 100, 400])
+
+    chunks = list(chunk_text(text, limit))
+
+    assert all(len(c) <= limit for c in chunks)
+    # 每段的围栏都成对出现
+    assert all(len(_FENCE.findall(c)) % 2 == 0 for c in chunks)
+    # 被拆开的 ``` 会留下无法识别为围栏的反引号，正文对不上
+    assert _content("\n".join(chunks)) == _content(text)
+
+
+def test_fence_reopened_with_info_string():
+    text = "intro\n```python\n" + "x = 1\n" * 60 + "```\nafter"
+
+    chunks = list(chunk_text(text, 80))
+
+    assert len(chunks) > 2
+    for c in chunks:
+        assert len(c) <= 80
+    for c in chunks[1:-1]:
+        assert c.startswith("```python\n")
+        assert c.endswith("\n```")
+
+
+def test_hard_cut_never_splits_fence():
+    # 没有任何空白可断开，硬切点恰好落在 ``` 中间
+    text = "a" * 34 + "```python\n" + "b" * 60
+
+    chunks = list(chunk_text(text, 40))
+
+    assert chunks[0] == "a" * 34
+    assert chunks[1].startswith("```python\n")
+    assert all(len(c) <= 40 for c in chunks)
+    assert _content("\n".join(chunks)) == _content(text)
+
+
+def test_short_text_is_single_chunk():
+    assert list(chunk_text("hello\n\nworld", 100)) == ["hello\n\nworld"]
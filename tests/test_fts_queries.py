@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+
+from src.database import Database
+from src.db.messages import _fts_queries, _use_fts
+
+_ROWS = [
+    "foo bar baz",
+    "foo only",
+    "bar only",
+    "foobar prefix",
+    "see https://a.com/x for details",
+    "C++ tips",
+    'he said "hi"',
+]
+
+
+@pytest.fixture
+def fts():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE VIRTUAL TABLE t USING fts5(text, tokenize='unicode61')")
+    conn.executemany("INSERT INTO t(text) VALUES (?)", [(r,) for r in _ROWS])
+    yield conn
+    conn.close()
+
+
+def _match(conn, keyword):
+    """与 MessagesDAO 相同的尝试顺序：语法错误时换下一个表达式"""
+    for query in _fts_queries(keyword):
+        try:
+            return {r[0] for r in conn.execute("SELECT text FROM t WHERE t MATCH ?", (query,))}
+        except sqlite3.OperationalError:
+            continue
+    return None
+
+
+def test_raw_query_is_tried_first():
+    assert _fts_queries("foo")[0] == "foo"
+    assert _fts_queries("foo* OR bar")[0] == "foo* OR bar"
+
+
+def test_quoted_fallback_follows_raw_query():
+    assert _fts_queries("C++ tips") == ("C++ tips", '"C++" "tips"')
+    assert _fts_queries('say "hi') == ('say "hi', '"say" """hi"')
+
+
+@pytest.mark.parametrize("keyword, expected", [
+    ("foo bar", {"foo bar baz"}),
+    ("foo*", {"foo bar baz", "foo only", "foobar prefix"}),
+    ("foo OR bar", {"foo bar baz", "foo only", "bar only"}),
+    ("https://a.com", {"see https://a.com/x for details"}),
+    ("C++", {"C++ tips"}),
+    ('"hi', {'he said "hi"'}),
+])
+def test_queries_match_via_index(fts, keyword, expected):
+    assert _match(fts, keyword) == expected
+
+
+def test_cjk_keywords_skip_fts():
+    assert not _use_fts("比特币")
+    assert not _use_fts("今天BTC")
+    assert _use_fts("BTC")
+
+
+@pytest.mark.asyncio
+async def test_search_falls_back_to_like_when_fts_finds_nothing(tmp_path):
+    db = Database(str(tmp_path / "t.db"))
+    await db.connect()
+    try:
+        await db.insert_messages_batch([
+            {"id": 1, "group_id": 1, "text": "我买了ETH", "date": "2026-01-01T00:00:00"},
+            {"id": 2, "group_id": 1, "text": "今天讨论比特币", "date": "2026-01-02T00:00:00"},
+            {"id": 3, "group_id": 1, "text": "BTC up", "date": "2026-01-03T00:00:00"},
+        ])
+
+        # ETH 只出现在中文里：FTS 零命中，改走 LIKE
+        assert await db.count_search_messages("ETH") == 1
+        assert [m["id"] for m in await db.search_messages("ETH")] == [1]
+        assert await db.search_messages("ETH", offset=1) == []
+        # CJK 关键词直接走 LIKE
+        assert [m["id"] for m in await db.search_messages("比特币")] == [2]
+        # FTS 有命中时不再 LIKE，翻页越界返回空页
+        assert await db.count_search_messages("BTC") == 1
+        assert await db.search_messages("BTC", offset=1) == []
+    finally:
+        await db.close()
@@ -0,0 +1,106 @@
+import pytest
+
+from src.bot_handlers.actions import BotActionsMixin
+from src.bot_handlers.utils import BotUtilsMixin
+
+
+class _Bot(BotUtilsMixin, BotActionsMixin):
+    """只组合搜索用到的 mixin（同 MonitorBot），数据库换成假实现"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def _ensure_db(self):
+        pass
+
+
+class _FakeDB:
+    def __init__(self, n):
+        self.rows = [
+            {"id": i, "group_id": 1, "group_title": "g", "sender_name": "s",
+             "text": f"hit {i}", "date": "2026-01-01T00:00:00"}
+            for i in range(n)
+        ]
+        self.count_calls = 0
+        self.search_calls = []
+
+    async def count_search_messages(self, keyword):
+        self.count_calls += 1
+        return len(self.rows)
+
+    async def search_messages(self, keyword, limit=50, offset=0):
+        self.search_calls.append(offset)
+        return self.rows[offset:offset + limit]
+
+
+class _FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_chat_action(self, **kwargs):
+        pass
+
+    async def send_message(self, **kwargs):
+        self.sent.append(kwargs["text"])
+
+
+class _FakeMessage:
+    chat_id = 42
+
+    def __init__(self, bot):
+        self._bot = bot
+        self.edits = []
+
+    def get_bot(self):
+        return self._bot
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append(text)
+
+
+@pytest.fixture
+def bot():
+    return _Bot(_FakeDB(25))
+
+
+@pytest.mark.asyncio
+async def test_paging_back_reuses_cached_count_and_pages(bot):
+    message = _FakeMessage(_FakeBot())
+    user_data = {}
+
+    await bot._do_search(message, "hit", page=0, user_data=user_data)
+    await bot._do_search(message, "hit", page=1, edit=True, user_data=user_data)
+    await bot._do_search(message, "hit", page=2, edit=True, user_data=user_data)
+    await bot._do_search(message, "hit", page=1, edit=True, user_data=user_data)
+    await bot._do_search(message, "hit", page=0, edit=True, user_data=user_data)
+
+    assert bot.db.count_calls == 1
+    assert bot.db.search_calls == [0, 10, 20]
+    assert "第 1/3 页，共 25 条结果" in message.edits[-1]
+
+
+@pytest.mark.asyncio
+async def test_new_keyword_or_dropped_cache_requeries(bot):
+    message = _FakeMessage(_FakeBot())
+    user_data = {}
+
+    await bot._do_search(message, "hit", page=0, user_data=user_data)
+    await bot._do_search(message, "other", page=0, user_data=user_data)
+    # 新搜索入口（cmd_search / 文本搜索）会先丢弃旧缓存
+    user_data.pop("search_cache", None)
+    await bot._do_search(message, "other", page=0, user_data=user_data)
+
+    assert bot.db.count_calls == 3
+    assert bot.db.search_calls == [0, 0, 0]
+
+
+@pytest.mark.asyncio
+async def test_page_is_clamped_to_last_page(bot):
+    message = _FakeMessage(_FakeBot())
+    user_data = {}
+
+    await bot._do_search(message, "hit", page=0, user_data=user_data)
+    await bot._do_search(message, "hit", page=9, edit=True, user_data=user_data)
+
+    assert bot.db.search_calls == [0, 20]
+    assert "第 3/3 页" in message.edits[-1]
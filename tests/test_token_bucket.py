@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import pytest
+
+from src.bot_handlers.utils import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_min_interval_spaces_grants_even_with_tokens_left():
+    bucket = TokenBucket(rate=1000, capacity=10, min_interval=0.05)
+
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    elapsed = time.monotonic() - start
+
+    # 第一次立即放行，其后三次各间隔 min_interval
+    assert elapsed >= 0.15 - 0.01
+
+
+@pytest.mark.asyncio
+async def test_burst_without_min_interval_is_immediate():
+    bucket = TokenBucket(rate=1, capacity=5)
+
+    start = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+
+    assert time.monotonic() - start < 0.05
+
+
+@pytest.mark.asyncio
+async def test_empty_bucket_waits_for_refill():
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    start = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+
+    # 桶容量 1：第 2、3 次各等 1/rate 秒补充令牌
+    assert time.monotonic() - start >= 2 / 20 - 0.01
+
+
+@pytest.mark.asyncio
+async def test_concurrent_acquires_are_serialized_by_min_interval():
+    bucket = TokenBucket(rate=1000, capacity=10, min_interval=0.03)
+    grants = []
+
+    async def worker():
+        await bucket.acquire()
+        grants.append(time.monotonic())
+
+    await asyncio.gather(*(worker() for _ in range(4)))
+
+    grants.sort()
+    gaps = [b - a for a, b in zip(grants, grants[1:])]
+    assert all(g >= 0.03 - 0.01 for g in gaps)